@@ -4,44 +4,175 @@ IPMentor - IPv4 Network Analysis and Subnetting Tutor
 Hugging Face Space Entry Point
 """
 
+import asyncio
+import atexit
+import ctypes
+import errno
 import logging
+import multiprocessing
 import os
-from ipmentor.ui import create_interface
+import queue
+import socket
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# glibc mallopt() parameter for the maximum number of malloc arenas
+M_ARENA_MAX = -8
+
+
+def _limit_malloc_arenas(max_arenas: int = 2) -> None:
+    """Cap glibc malloc arenas unless MALLOC_ARENA_MAX was set at process start."""
+    if not sys.platform.startswith("linux") or "MALLOC_ARENA_MAX" in os.environ:
+        return
+    try:
+        ctypes.CDLL("libc.so.6").mallopt(M_ARENA_MAX, max_arenas)
+    except (OSError, AttributeError):
+        # Not glibc (e.g. musl); leave the allocator defaults alone
+        pass
+
+
+# Must run before any worker threads start allocating
+_limit_malloc_arenas()
+
+# Skip Gradio's analytics/version-check requests and Hub telemetry; must be
+# set before Gradio is imported
+os.environ.setdefault("GRADIO_ANALYTICS_ENABLED", "False")
+os.environ.setdefault("HF_HUB_DISABLE_TELEMETRY", "1")
+
+import ipmentor
+from ipmentor.config import CONFIG
+
+# Configure logging: records are enqueued by the caller and formatted/written
+# to stderr by a background listener thread
+_log_queue = queue.SimpleQueue()
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+_log_listener = QueueListener(_log_queue, _log_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+logging.basicConfig(level=logging.INFO, handlers=[QueueHandler(_log_queue)], format='%(message)s')
 
 logger = logging.getLogger(__name__)
 
+
+def _build_app():
+    """Build the app; the first access to create_interface imports the UI."""
+    return ipmentor.create_interface()
+
+
+def _find_available_port(host: str, port: int, retries: int) -> int:
+    """Return the first bindable port starting at `port`, trying up to `retries` more."""
+    for candidate in range(port, port + retries + 1):
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            # Match uvicorn's bind, so a port left in TIME_WAIT by a restart counts as free
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            try:
+                sock.bind((host, candidate))
+                return candidate
+            except OSError as e:
+                if e.errno != errno.EADDRINUSE:
+                    raise
+                logger.warning("⚠️ Port %d already in use", candidate, extra={"port": candidate})
+    raise OSError(errno.EADDRINUSE, f"No free port in range {port}-{port + retries}")
+
+
+def _cache_api_info(app) -> None:
+    """Compute Gradio's API info once per process and reuse it for later requests."""
+    compute_api_info = app.get_api_info
+    cached = {}
+    lock = threading.Lock()
+
+    def get_api_info(all_endpoints: bool = False):
+        with lock:
+            if all_endpoints not in cached:
+                cached[all_endpoints] = compute_api_info(all_endpoints=all_endpoints)
+            return cached[all_endpoints]
+
+    app.get_api_info = get_api_info
+
+
+def _warmup():
+    """Exercise the tool code paths once so the first request is served warm."""
+    try:
+        from ipmentor.tools import warmup
+        warmup()
+    except Exception as e:
+        logger.warning("⚠️ Warmup failed: %s", e)
+
+
 def main():
     """Main application entry point for Hugging Face Space."""
     logger.info("Starting IPMentor v1.0.0 for Hugging Face Space")
-    
-    # Create Gradio app
-    app = create_interface()
-    
+
+    # A ready file left by a previous run must not report this one as ready
+    ready_file = Path(CONFIG.ready_file)
+    ready_file.unlink(missing_ok=True)
+    atexit.register(ready_file.unlink, missing_ok=True)
+
+    # Use uvloop for the server's event loop when available
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+
+    # Build Gradio app in the background while the launch config is prepared
+    executor = ThreadPoolExecutor(max_workers=1)
+    app_future = executor.submit(_build_app)
+    executor.shutdown(wait=False)
+
     # Launch configuration for Hugging Face Space
-    port = int(os.getenv("GRADIO_SERVER_PORT", 7860))
+    port = _find_available_port("0.0.0.0", CONFIG.space_port, CONFIG.port_retries)
+    max_threads = CONFIG.max_threads
+    if max_threads < CONFIG.queue_concurrency:
+        logger.warning(
+            "⚠️ max_threads (%d) is below queue concurrency (%d); requests will wait for worker threads",
+            max_threads, CONFIG.queue_concurrency
+        )
     launch_config = {
         "server_name": "0.0.0.0",
         "server_port": port,  # Use environment port or default
         "share": False,
         "show_error": True,
         "mcp_server": True,  # Enable MCP for Space
-        "quiet": False
+        "quiet": False,
+        "max_threads": max_threads,  # Worker threads for sync tools
+        "prevent_thread_lock": True  # Return once the server is up
     }
-    
-    logger.info(f"🌐 Web Interface: Starting on port {port}")
-    logger.info("🤖 MCP Server: Enabled for Hugging Face Space")
-    
+
+    logger.info(
+        "🌐 Web Interface: Starting on port %d\n🤖 MCP Server: Enabled for Hugging Face Space\n🧵 Worker threads: %d",
+        port, max_threads,
+        extra={"port": port, "mcp_server": True, "max_threads": max_threads}
+    )
+
     try:
+        app = app_future.result()
+        _cache_api_info(app)
+        app.queue(
+            default_concurrency_limit=CONFIG.queue_concurrency,
+            max_size=CONFIG.queue_max
+        )
         app.launch(**launch_config)
+        threading.Thread(target=_warmup, daemon=True).start()
+
+        # Signal readiness to health probes, then keep serving
+        ready_file.touch()
+        logger.info("✅ Ready: %s", CONFIG.ready_file, extra={"ready_file": CONFIG.ready_file})
+        app.block_thread()
+    except OSError as e:
+        logger.error("❌ Network error launching app on port %d: %s", port, e, extra={"port": port})
+        raise
     except Exception as e:
-        logger.error(f"❌ Error launching app: {e}")
+        logger.error("❌ Error launching app: %s", e)
         raise
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    multiprocessing.freeze_support()
+    # Shorter GIL switch interval (default 5 ms) for fairer latency across worker threads
+    sys.setswitchinterval(0.001)
+    main()
@@ -5,31 +5,76 @@ Creates validated subnetting exercises using IPMentor MCP tools
 """
 
 import asyncio
+import contextvars
+import functools
+import ipaddress
+import math
 import os
 import json
+import logging
 import re
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Optional
 from dotenv import load_dotenv
 import tempfile
 from pathlib import Path
 import zipfile
-import requests
+import httpx
 
+import fastjsonschema
 import gradio as gr
-from openai import OpenAI
-import markdown
-import pdfkit
+from openai import AsyncOpenAI
+from markdown_it_pyrs import MarkdownIt
+from weasyprint import HTML
 
 from langchain_mcp_adapters.client import MultiServerMCPClient
+from langchain_mcp_adapters.tools import load_mcp_tools
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # CONFIGURATION
 
 # Fixed MCP server URL for IPMentor
 IPMENTOR_MCP_SERVER_URL = "https://agents-mcp-hackathon-ipmentor.hf.space/gradio_api/mcp/sse"
 
+# Maximum number of exercises validated concurrently against the MCP server
+VALIDATION_CONCURRENCY = int(os.getenv("VALIDATION_CONCURRENCY", "8"))
+
+# Markdown renderer for the PDF pipeline (CommonMark plus GFM tables)
+MARKDOWN_RENDERER = MarkdownIt("commonmark").enable("table")
+
+# Host numbers to substitute: standalone (whitespace on both sides) or directly
+# followed by "hosts", as in "(50 hosts". IP addresses with optional CIDR are
+# matched first by their own branch so the numbers inside them are never touched
+HOST_NUMBER_RE = re.compile(
+    r'(?P<ip>\d+\.\d+\.\d+\.\d+(?:/\d+)?)'
+    r'|(?:(?<=\s)|\b(?=\d+\s+hosts?\b))(?P<num>\d+)(?=\s)',
+    re.IGNORECASE
+)
+
+# Requested host counts in an exercise's requirements, or in its scenario as a fallback
+HOSTS_REQ_RE = re.compile(r'(\d+)\s*hosts?', re.IGNORECASE)
+HOSTS_MULTI_RE = re.compile(r'(\d+)\s*(?:hosts?|dispositivos?|devices?)', re.IGNORECASE)
+
+# Shape required from each LLM-generated exercise, compiled once
+EXERCISE_SCHEMA = {
+    "type": "object",
+    "required": ["exercise_number", "title", "scenario", "network", "requirements", "method"],
+    "properties": {
+        "number": {"default": 2},
+        "hosts_list": {"default": ""}
+    }
+}
+validate_exercise = fastjsonschema.compile(EXERCISE_SCHEMA)
+
+# Tools bound to the MCP session shared by the current validation batch
+batch_tools: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar("batch_tools", default={})
+
+# Successful tool results of the current validation batch, keyed on tool name and arguments
+batch_results: contextvars.ContextVar[Optional[Dict[tuple, Any]]] = contextvars.ContextVar("batch_results", default=None)
+
 # Default exercise templates by language
 DEFAULT_TEMPLATES = {
     "English": "A company needs to divide the network {network} for its {num_departments} departments. Each department requires approximately {hosts} hosts. Design the appropriate subnetting scheme.",
@@ -38,6 +83,20 @@ DEFAULT_TEMPLATES = {
     "German": "Ein Unternehmen muss das Netzwerk {network} für seine {num_departments} Abteilungen aufteilen. Jede Abteilung benötigt etwa {hosts} Hosts. Entwerfen Sie das entsprechende Subnetting-Schema."
 }
 
+# Sentence appended to an exercise statement that does not mention its network
+NETWORK_SUFFIXES = {
+    "English": " They have been assigned the network {network}.",
+    "Spanish": " Tienen asignado el direccionamiento {network}.",
+    "French": " Ils ont l'adressage {network} assigné.",
+    "German": " Sie haben die Adressierung {network} zugewiesen."
+}
+
+# Static system message; kept first and byte-identical so providers can reuse its prefix
+SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": "You are an expert networking instructor who creates realistic subnetting exercises. Always return valid JSON arrays."
+}
+
 # Exercise generation prompts by language
 EXERCISE_GENERATION_PROMPTS = {
     "English": """Generate {num_exercises} unique subnetting exercises with {difficulty} difficulty level.
@@ -167,16 +226,11 @@ Machen Sie die Übungen realistisch und lehrreich."""
 
 # UTILITY FUNCTIONS
 
+@functools.singledispatch
 def safe_json_serialize(obj):
     """Safely serialize an object to JSON, handling non-serializable types."""
     try:
-        if isinstance(obj, (str, int, float, bool, type(None))):
-            return obj
-        elif isinstance(obj, dict):
-            return {k: safe_json_serialize(v) for k, v in obj.items()}
-        elif isinstance(obj, (list, tuple)):
-            return [safe_json_serialize(item) for item in obj]
-        elif hasattr(obj, '__dict__'):
+        if hasattr(obj, '__dict__'):
             return safe_json_serialize(obj.__dict__)
         elif hasattr(obj, 'dict') and callable(obj.dict):
             return safe_json_serialize(obj.dict())
@@ -187,208 +241,326 @@ def safe_json_serialize(obj):
     except Exception:
         return str(obj)
 
+@safe_json_serialize.register(str)
+@safe_json_serialize.register(int)
+@safe_json_serialize.register(float)
+@safe_json_serialize.register(type(None))
+def _serialize_primitive(obj):
+    # bool is covered by int
+    return obj
+
+@safe_json_serialize.register(dict)
+def _serialize_dict(obj):
+    try:
+        return {k: safe_json_serialize(v) for k, v in obj.items()}
+    except Exception:
+        return str(obj)
+
+@safe_json_serialize.register(list)
+@safe_json_serialize.register(tuple)
+def _serialize_sequence(obj):
+    try:
+        return [safe_json_serialize(item) for item in obj]
+    except Exception:
+        return str(obj)
+
 def safe_json_dumps(obj, **kwargs):
     """Safe JSON dumps that handles non-serializable objects."""
+    try:
+        # Fast path: most objects are already JSON-native
+        return json.dumps(obj, **kwargs)
+    except (TypeError, ValueError):
+        pass
     try:
         return json.dumps(safe_json_serialize(obj), **kwargs)
     except Exception as e:
         return json.dumps({"error": f"Error serializing: {str(e)}", "data": str(obj)}, **kwargs)
 
-def markdown_to_pdf(markdown_content: str, output_path: str) -> str:
-    """Convert markdown to PDF using pdfkit."""
+# (predicate, extractor) pairs tried in order to get a tool's input JSON schema
+SCHEMA_EXTRACTORS = [
+    (lambda t: getattr(t, 'input_schema', None) is not None, lambda t: t.input_schema),
+    (lambda t: isinstance(getattr(t, 'args_schema', None), dict), lambda t: t.args_schema),
+    (lambda t: hasattr(getattr(t, 'args_schema', None), 'model_json_schema'), lambda t: t.args_schema.model_json_schema()),
+    (lambda t: hasattr(getattr(t, 'args_schema', None), 'schema'), lambda t: t.args_schema.schema()),
+]
+
+def extract_tool_schema(tool) -> Any:
+    """Return the input schema of an MCP tool, or None if it exposes none."""
+    for predicate, extractor in SCHEMA_EXTRACTORS:
+        if predicate(tool):
+            return extractor(tool)
+    return None
+
+def first_host_count(text: str, pattern: re.Pattern) -> Optional[int]:
+    """Return the first host count matched by pattern in text, or None."""
+    # search stops at the earliest match instead of building a findall list
+    match = pattern.search(text) if text else None
+    return int(match.group(1)) if match else None
+
+def precheck_exercise(exercise: Dict) -> Optional[Dict]:
+    """
+    Check an exercise offline against the calculator's capacity limits.
+    
+    Returns an error dict shaped like the calculator's when the exercise
+    cannot possibly be solved, or None when the server has to decide.
+    """
     try:
-        # Convert markdown to HTML and add exercise break classes
-        html_content = markdown.markdown(markdown_content, extensions=['tables', 'fenced_code'])
+        network = ipaddress.IPv4Network(exercise["network"], strict=False)
+        method = exercise["method"]
         
-        # Add CSS classes for better page breaks
-        import re
-        # Add exercise-break class to h2 elements (exercises)
-        html_content = re.sub(r'<h2>', r'<h2 class="exercise-break">', html_content)
+        if method == "vlsm":
+            hosts = sorted((int(h) for h in exercise["hosts_list"].split(",")), reverse=True)
+            if not hosts or hosts[-1] < 1:
+                return None
+            used = 0
+            for hosts_needed in hosts:
+                # Aligned block size, as allocated by the calculator (/32 and /31 for 1 and 2 hosts)
+                used += hosts_needed if hosts_needed <= 2 else 2 ** math.ceil(math.log2(hosts_needed + 2))
+                if used > network.num_addresses:
+                    return {"error": f"Cannot allocate subnet for {hosts_needed} hosts"}
         
-        # Get the logo path
-        logo_path = Path(__file__).parent.parent / "assets" / "logo.svg"
-        logo_exists = logo_path.exists()
+        elif method == "max_subnets":
+            number = int(exercise["number"])
+            if number >= 1 and network.prefixlen + math.ceil(math.log2(number)) > 32:
+                return {"error": "Too many subnets requested"}
         
-        # Add CSS styling with IPMentor branding colors
-        styled_html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <style>
-                @page {{
-                    margin: 1in 1in 100px 1in;
-                }}
-                
-                body {{ 
-                    font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; 
-                    line-height: 1.6; 
-                    margin: 0;
-                    padding: 20px;
-                    color: #333;
-                    background: #fefefe;
-                }}
-                
-                h1 {{ 
-                    color: #FC8100; 
-                    border-bottom: 4px solid #FED200;
-                    padding-bottom: 15px;
-                    margin-bottom: 30px;
-                    font-size: 2.2em;
-                    font-weight: bold;
-                }}
-                
-                h2 {{ 
-                    color: #FC8100; 
-                    border-bottom: 3px solid #FFCB00;
-                    padding-bottom: 8px;
-                    margin-top: 40px;
-                    margin-bottom: 20px;
-                    font-size: 1.5em;
-                    page-break-after: avoid;
-                }}
-                
-                h3 {{ 
-                    color: #FE8100; 
-                    margin-top: 25px;
-                    margin-bottom: 15px;
-                    font-size: 1.2em;
-                }}
-                
-                p {{
-                    margin-bottom: 15px;
-                    text-align: justify;
-                }}
-                
-                em {{
-                    color: #F05600;
-                    font-style: italic;
-                }}
-                
-                strong {{
-                    color: #FE8100;
-                }}
-                
-                a {{
-                    color: #F05600;
-                    text-decoration: none;
-                    border-bottom: 1px dotted #F05600;
-                }}
-                
-                a:hover {{
-                    border-bottom: 1px solid #F05600;
-                }}
-                
-                img {{ 
-                    max-width: 85%; 
-                    max-height: 450px;
-                    height: auto; 
-                    display: block;
-                    margin: 25px auto;
-                    border: 2px solid #FED200;
-                    border-radius: 8px;
-                    box-shadow: 0 4px 8px rgba(254, 129, 0, 0.1);
-                }}
-                
-                code {{
-                    background: #FFF4E6;
-                    color: #FC8100;
-                    padding: 2px 6px;
-                    border-radius: 4px;
-                    font-family: 'Courier New', monospace;
-                    border: 1px solid #FED200;
-                }}
-                
-                pre {{ 
-                    background: #FFF8F0; 
-                    padding: 20px; 
-                    border-radius: 8px;
-                    border-left: 6px solid #F05600;
-                    margin: 20px 0;
-                    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                }}
-                
-                hr {{
-                    border: none;
-                    height: 3px;
-                    background: linear-gradient(90deg, #F05600, #FED200, #FFCB00);
-                    margin: 30px 0;
-                    border-radius: 2px;
-                }}
-                
-                
-                .exercise-break {{
-                    page-break-before: always;
-                    margin-top: 0;
-                }}
-                
-                .exercise-break:first-of-type {{
-                    page-break-before: avoid;
-                }}
-            </style>
-        </head>
-        <body>
-        {html_content}
+        elif method == "max_hosts_per_subnet":
+            number = int(exercise["number"])
+            bits_for_hosts = (1 if number == 2 else 0) if number <= 2 else math.ceil(math.log2(number + 2))
+            if 32 - bits_for_hosts < network.prefixlen:
+                return {"error": "Too many hosts requested"}
+    except (KeyError, TypeError, ValueError):
+        pass
+    return None
+
+class ExerciseStreamParser:
+    """Incrementally extract the objects of a top-level JSON array from streamed text."""
+
+    def __init__(self):
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._current = None
+        self._found = 0
+        self.done = False
+
+    def feed(self, text: str) -> List[Any]:
+        """Consume a chunk of text and return the array items completed by it."""
+        items = []
+        for ch in text:
+            if self.done:
+                break
+
+            # Skip any prose before the opening bracket of the array
+            if not self._started:
+                if ch == '[':
+                    self._started = True
+                    self._depth = 1
+                continue
+
+            if self._current is not None:
+                self._current.append(ch)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in '[{':
+                if ch == '{' and self._depth == 1:
+                    self._current = [ch]
+                self._depth += 1
+            elif ch in ']}':
+                self._depth -= 1
+                if self._depth == 1 and self._current is not None:
+                    item_str = "".join(self._current)
+                    self._current = None
+                    try:
+                        items.append(json.loads(item_str))
+                        self._found += 1
+                    except json.JSONDecodeError as e:
+                        logger.debug("Skipping malformed exercise JSON: %s", e)
+                elif self._depth == 0:
+                    if self._found:
+                        self.done = True
+                    else:
+                        # Bracket in prose (e.g. "[3]"), keep looking for the array
+                        self._started = False
+        return items
+
+# PDF styling with IPMentor branding colors; filled in with the footer and rendered body
+PDF_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <style>
+        @page {{
+            size: A4;
+            margin: 1in 1in 100px 1in;
+            
+            @bottom-center {{
+                content: element(footer);
+            }}
+        }}
         
-        </body>
-        </html>
-        """
+        body {{ 
+            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; 
+            line-height: 1.6; 
+            margin: 0;
+            padding: 20px;
+            color: #333;
+            background: #fefefe;
+        }}
         
-        # Create temporary footer HTML file with logo
-        footer_html_path = None
-        if logo_exists:
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False, encoding='utf-8') as footer_file:
-                footer_html_path = footer_file.name
-                footer_content = f"""
-                <!DOCTYPE html>
-                <html>
-                <head>
-                    <meta charset="UTF-8">
-                    <style>
-                        body {{
-                            margin: 0;
-                            padding: 8px;
-                            text-align: center;
-                        }}
-                        .logo {{
-                            height: 38px;
-                            width: auto;
-                        }}
-                    </style>
-                </head>
-                <body>
-                    <img src="{logo_path.as_uri()}" alt="IPMentor" class="logo">
-                </body>
-                </html>
-                """
-                footer_file.write(footer_content)
+        h1 {{ 
+            color: #FC8100; 
+            border-bottom: 4px solid #FED200;
+            padding-bottom: 15px;
+            margin-bottom: 30px;
+            font-size: 2.2em;
+            font-weight: bold;
+        }}
         
-        # Configure PDF options
-        options = {
-            'page-size': 'A4',
-            'margin-top': '1in',
-            'margin-right': '1in',
-            'margin-bottom': '1in',
-            'margin-left': '1in',
-            'encoding': "UTF-8",
-            'no-outline': None,
-            'enable-local-file-access': None,
-            'print-media-type': None,
-            'disable-smart-shrinking': None
-        }
+        h2 {{ 
+            color: #FC8100; 
+            border-bottom: 3px solid #FFCB00;
+            padding-bottom: 8px;
+            margin-top: 40px;
+            margin-bottom: 20px;
+            font-size: 1.5em;
+            page-break-after: avoid;
+        }}
         
-        # Add footer if logo exists
-        if footer_html_path:
-            options['footer-html'] = footer_html_path
-            options['footer-spacing'] = '5'
+        h3 {{ 
+            color: #FE8100; 
+            margin-top: 25px;
+            margin-bottom: 15px;
+            font-size: 1.2em;
+        }}
         
-        # Generate PDF
-        try:
-            pdfkit.from_string(styled_html, output_path, options=options)
-        finally:
-            # Clean up temporary footer file
-            if footer_html_path and os.path.exists(footer_html_path):
-                os.remove(footer_html_path)
+        p {{
+            margin-bottom: 15px;
+            text-align: justify;
+        }}
+        
+        em {{
+            color: #F05600;
+            font-style: italic;
+        }}
+        
+        strong {{
+            color: #FE8100;
+        }}
+        
+        a {{
+            color: #F05600;
+            text-decoration: none;
+            border-bottom: 1px dotted #F05600;
+        }}
+        
+        a:hover {{
+            border-bottom: 1px solid #F05600;
+        }}
+        
+        img {{ 
+            max-width: 85%; 
+            max-height: 450px;
+            height: auto; 
+            display: block;
+            margin: 25px auto;
+            border: 2px solid #FED200;
+            border-radius: 8px;
+            box-shadow: 0 4px 8px rgba(254, 129, 0, 0.1);
+        }}
+        
+        code {{
+            background: #FFF4E6;
+            color: #FC8100;
+            padding: 2px 6px;
+            border-radius: 4px;
+            font-family: 'Courier New', monospace;
+            border: 1px solid #FED200;
+        }}
+        
+        pre {{ 
+            background: #FFF8F0; 
+            padding: 20px; 
+            border-radius: 8px;
+            border-left: 6px solid #F05600;
+            margin: 20px 0;
+            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+        }}
+        
+        hr {{
+            border: none;
+            height: 3px;
+            background: linear-gradient(90deg, #F05600, #FED200, #FFCB00);
+            margin: 30px 0;
+            border-radius: 2px;
+        }}
+        
+        
+        .exercise-break {{
+            page-break-before: always;
+            margin-top: 0;
+        }}
+        
+        .exercise-break:first-of-type {{
+            page-break-before: avoid;
+        }}
+        
+        .footer {{
+            position: running(footer);
+            padding: 8px;
+            text-align: center;
+        }}
+        
+        .footer .logo {{
+            height: 38px;
+            width: auto;
+            max-width: none;
+            margin: 0;
+            border: none;
+            border-radius: 0;
+            box-shadow: none;
+        }}
+    </style>
+</head>
+<body>
+{footer_html}
+{html_content}
+
+</body>
+</html>
+"""
+
+# Logo repeated on every PDF page as a running footer
+LOGO_PATH = Path(__file__).parent.parent / "assets" / "logo.svg"
+PDF_FOOTER_HTML = (
+    f'<div class="footer"><img src="{LOGO_PATH.as_uri()}" alt="IPMentor" class="logo"></div>'
+    if LOGO_PATH.exists() else ""
+)
+
+def markdown_to_pdf(markdown_content: str, output_path: str) -> str:
+    """Convert markdown to PDF using WeasyPrint."""
+    try:
+        # Convert markdown to HTML and add exercise break classes
+        html_content = MARKDOWN_RENDERER.render(markdown_content)
+        
+        # Add exercise-break class to h2 elements (exercises) for better page breaks
+        html_content = html_content.replace('<h2>', '<h2 class="exercise-break">')
+        
+        styled_html = PDF_TEMPLATE.format(footer_html=PDF_FOOTER_HTML, html_content=html_content)
+        
+        # Generate PDF in-process
+        HTML(string=styled_html, base_url=str(Path(__file__).parent.parent)).write_pdf(output_path)
         
         return output_path
         
@@ -401,19 +573,31 @@ class ExerciseGenerator:
     def __init__(self):
         self.mcp_client = None
         self.tools = []
+        self._tools_by_name = {}
+        # Diagram downloads in progress, by URL
+        self._image_downloads: Dict[str, asyncio.Future] = {}
         self.connection_status = "Disconnected"
         
+        # Shared HTTP client for OpenRouter and diagram downloads, so connections
+        # (and TLS sessions) are kept alive across requests
+        self._http = httpx.AsyncClient(
+            headers={"User-Agent": "ipmentor-generator"},
+            limits=httpx.Limits(max_keepalive_connections=32, keepalive_expiry=60),
+            timeout=httpx.Timeout(60.0, connect=10.0)
+        )
+        
         # Configure OpenAI client for OpenRouter with Mistral Medium 3
-        self.openai_client = OpenAI(
+        self.openai_client = AsyncOpenAI(
             api_key=os.getenv("OPENROUTER_API_KEY"),
             base_url=os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1"),
+            http_client=self._http
         )
         self.model_name = "mistralai/mistral-medium-3"
     
     async def connect_to_ipmentor(self) -> str:
         """Connect to IPMentor MCP server"""
         try:
-            print(f"Connecting to IPMentor server: {IPMENTOR_MCP_SERVER_URL}")
+            logger.info("Connecting to IPMentor server: %s", IPMENTOR_MCP_SERVER_URL)
             
             self.mcp_client = MultiServerMCPClient({
                 "ipmentor": {
@@ -424,6 +608,7 @@ class ExerciseGenerator:
             
             # Get available tools
             mcp_tools = await self.mcp_client.get_tools()
+            self._tools_by_name = {tool.name: tool for tool in mcp_tools}
             
             # Convert tools to OpenAI format
             self.tools = []
@@ -431,22 +616,14 @@ class ExerciseGenerator:
                 input_schema = {"type": "object", "properties": {}, "required": []}
                 
                 try:
-                    schema_obj = None
-                    if hasattr(tool, 'input_schema'):
-                        schema_obj = tool.input_schema
-                    elif hasattr(tool, 'args_schema') and tool.args_schema:
-                        if hasattr(tool.args_schema, 'model_json_schema'):
-                            schema_obj = tool.args_schema.model_json_schema()
-                        elif hasattr(tool.args_schema, 'schema'):
-                            schema_obj = tool.args_schema.schema()
-                    
+                    schema_obj = extract_tool_schema(tool)
                     if schema_obj:
                         serialized_schema = safe_json_serialize(schema_obj)
                         if isinstance(serialized_schema, dict):
                             input_schema = serialized_schema
                             
                 except Exception as e:
-                    print(f"Warning: Could not serialize schema for {tool.name}: {e}")
+                    logger.warning("Could not serialize schema for %s: %s", tool.name, e)
                 
                 tool_def = {
                     "type": "function",
@@ -467,18 +644,33 @@ class ExerciseGenerator:
             return f"❌ Connection error: {str(e)}"
     
     async def call_mcp_tool(self, tool_name: str, tool_args: dict) -> Any:
+        """Call a tool from the MCP server, reusing identical calls within a batch"""
+        cache = batch_results.get()
+        if cache is None:
+            return await self._call_mcp_tool(tool_name, tool_args)
+        
+        key = (tool_name, json.dumps(tool_args, sort_keys=True))
+        if key not in cache:
+            result = await self._call_mcp_tool(tool_name, tool_args)
+            if isinstance(result, dict) and "error" in result:
+                return result
+            cache[key] = result
+        return cache[key]
+    
+    async def _call_mcp_tool(self, tool_name: str, tool_args: dict) -> Any:
         """Call a tool from the MCP server"""
         try:
             if not self.mcp_client:
                 return {"error": "MCP client not initialized"}
             
-            mcp_tools = await self.mcp_client.get_tools()
-            tool_to_call = None
-            
-            for tool in mcp_tools:
-                if tool.name == tool_name:
-                    tool_to_call = tool
-                    break
+            # Prefer tools bound to the current batch's shared session
+            tools_by_name = batch_tools.get() or self._tools_by_name
+            tool_to_call = tools_by_name.get(tool_name)
+            if not tool_to_call:
+                # Refresh the cache in case the server's tools changed
+                mcp_tools = await self.mcp_client.get_tools()
+                self._tools_by_name = {tool.name: tool for tool in mcp_tools}
+                tool_to_call = self._tools_by_name.get(tool_name)
             
             if not tool_to_call:
                 return {"error": f"Tool {tool_name} not found"}
@@ -525,115 +717,69 @@ class ExerciseGenerator:
         except Exception as e:
             return {"error": f"Error calling tool {tool_name}: {str(e)}"}
     
-    def generate_exercises_with_llm(self, num_exercises: int, difficulty: str, language: str, template: str) -> List[Dict]:
-        """Generate exercises using LLM"""
+    async def generate_exercises_with_llm(self, num_exercises: int, difficulty: str, language: str, template: str) -> AsyncIterator[Dict]:
+        """Generate exercises using LLM, yielding each one as soon as it is streamed"""
         try:
-            print(f"Starting LLM generation: {num_exercises} exercises, {difficulty} difficulty, {language} language")
+            logger.debug("Starting LLM generation: %d exercises, %s difficulty, %s language", num_exercises, difficulty, language)
             
             # Use default template if none provided
             if not template.strip():
                 template = DEFAULT_TEMPLATES.get(language, DEFAULT_TEMPLATES["English"])
             
-            print(f"Using template: {template[:100]}...")
+            logger.debug("Using template: %.100s...", template)
             
             # Get the prompt for the language
             prompt = EXERCISE_GENERATION_PROMPTS.get(language, EXERCISE_GENERATION_PROMPTS["English"])
-            print(f"Using prompt for language: {language}")
+            logger.debug("Using prompt for language: %s", language)
             
             formatted_prompt = prompt.format(
                 num_exercises=num_exercises,
                 difficulty=difficulty,
                 template=template
             )
-            print(f"Formatted prompt length: {len(formatted_prompt)}")
+            logger.debug("Formatted prompt length: %d", len(formatted_prompt))
             
-            response = self.openai_client.chat.completions.create(
+            stream = await self.openai_client.chat.completions.create(
                 model=self.model_name,
                 messages=[
-                    {"role": "system", "content": "You are an expert networking instructor who creates realistic subnetting exercises. Always return valid JSON arrays."},
+                    SYSTEM_MESSAGE,
                     {"role": "user", "content": formatted_prompt}
                 ],
-                temperature=0.7
+                temperature=0.7,
+                stream=True
             )
             
-            if not response.choices or len(response.choices) == 0:
-                print("No choices in LLM response")
-                return []
-            
-            print(f"Got response with {len(response.choices)} choices")
-            
-            content = response.choices[0].message.content
-            if not content:
-                print("Empty content in LLM response")
-                return []
-            
-            content = content.strip()
-            print(f"Response content length: {len(content)}")
-            print(f"First 200 chars: {content[:200]}")
-            
-            # Extract JSON from response (handle markdown code blocks)
-            json_match = re.search(r'```(?:json)?\s*(\[.*?\])\s*```', content, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(1)
-                print("Found JSON in code blocks")
-            else:
-                # Try to find JSON array directly
-                json_match = re.search(r'(\[.*?\])', content, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group(1)
-                    print("Found JSON array directly")
-                else:
-                    json_str = content
-                    print("Using full content as JSON")
-            
-            print(f"JSON string length: {len(json_str)}")
-            print(f"JSON preview: {json_str[:200]}")
-            
-            exercises = json.loads(json_str)
-            print(f"Successfully parsed JSON. Type: {type(exercises)}")
-            
-            # Validate that exercises is a list
-            if not isinstance(exercises, list):
-                print(f"Expected list but got {type(exercises)}")
-                return []
-            
-            print(f"Got {len(exercises)} exercises from LLM")
-            
-            # Validate each exercise has required fields
-            valid_exercises = []
-            for i, exercise in enumerate(exercises):
-                print(f"Processing exercise {i+1}: {type(exercise)}")
-                
-                if not isinstance(exercise, dict):
-                    print(f"Exercise {i} is not a dictionary")
-                    continue
-                
-                print(f"Exercise {i+1} keys: {list(exercise.keys())}")
-                
-                required_fields = ['exercise_number', 'title', 'scenario', 'network', 'requirements', 'method']
-                missing_fields = [f for f in required_fields if f not in exercise]
-                
-                if not missing_fields:
-                    # Ensure proper data types
-                    if 'number' not in exercise:
-                        exercise['number'] = 2
-                    if 'hosts_list' not in exercise:
-                        exercise['hosts_list'] = ""
-                    valid_exercises.append(exercise)
-                    print(f"Exercise {i+1} is valid")
-                else:
-                    print(f"Exercise {i+1} missing required fields: {missing_fields}")
+            # Parse exercises out of the stream as their objects close
+            parser = ExerciseStreamParser()
+            count = 0
+            # Closing the stream releases its pooled connection when we stop reading early
+            async with stream:
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    content = chunk.choices[0].delta.content
+                    if not content:
+                        continue
+                    
+                    for exercise in parser.feed(content):
+                        count += 1
+                        try:
+                            # Fills in the defaults for number and hosts_list
+                            exercise = validate_exercise(exercise)
+                        except fastjsonschema.JsonSchemaException as e:
+                            logger.debug("Exercise %d is invalid: %s", count, e.message)
+                            continue
+                        
+                        logger.debug("Exercise %d is valid", count)
+                        yield exercise
+                    
+                    if parser.done:
+                        break
             
-            print(f"Returning {len(valid_exercises)} valid exercises")
-            return valid_exercises
+            logger.debug("Got %d exercises from LLM", count)
             
-        except json.JSONDecodeError as e:
-            print(f"JSON parsing error: {e}")
-            print(f"Content that failed to parse: {content if 'content' in locals() else 'No content'}")
-            return []
         except Exception as e:
-            print(f"Error generating exercises: {e}")
-            return []
+            logger.error("Error generating exercises: %s", e)
     
     async def validate_and_fix_exercise(self, exercise: Dict) -> Dict:
         """Validate exercise using MCP tools and fix if needed"""
@@ -641,7 +787,7 @@ class ExerciseGenerator:
         
         for attempt in range(max_attempts):
             try:
-                print(f"Validating exercise {exercise['exercise_number']} (attempt {attempt + 1})")
+                logger.debug("Validating exercise %s (attempt %d)", exercise['exercise_number'], attempt + 1)
                 
                 # Prepare tool arguments based on method
                 if exercise["method"] == "vlsm":
@@ -659,21 +805,21 @@ class ExerciseGenerator:
                         "hosts_per_subnet": ""
                     }
                 
-                # Test subnet calculation
-                result = await self.call_mcp_tool("ipmentor_subnet_calculator", tool_args)
+                # Test subnet calculation, skipping the server when the exercise is provably impossible
+                result = precheck_exercise(exercise) or await self.call_mcp_tool("ipmentor_subnet_calculator", tool_args)
                 
                 if "error" not in result:
-                    print(f"✅ Exercise {exercise['exercise_number']} is valid")
+                    logger.debug("✅ Exercise %s is valid", exercise['exercise_number'])
                     return exercise
                 
-                print(f"❌ Exercise {exercise['exercise_number']} failed validation: {result.get('error', 'Unknown error')}")
+                logger.debug("❌ Exercise %s failed validation: %s", exercise['exercise_number'], result.get('error', 'Unknown error'))
                 
                 # Try to fix the exercise
                 if attempt < max_attempts - 1:
                     exercise = await self.fix_exercise(exercise, result.get('error', ''))
                 
             except Exception as e:
-                print(f"Error validating exercise: {e}")
+                logger.warning("Error validating exercise: %s", e)
                 if attempt < max_attempts - 1:
                     # Simple fallback: reduce requirements
                     if exercise["method"] == "vlsm" and exercise["hosts_list"]:
@@ -682,12 +828,17 @@ class ExerciseGenerator:
                     elif exercise["method"] != "vlsm":
                         exercise["number"] = max(2, exercise["number"] // 2)
         
-        print(f"⚠️ Could not validate exercise {exercise['exercise_number']} after {max_attempts} attempts")
+        logger.warning("⚠️ Could not validate exercise %s after %d attempts", exercise['exercise_number'], max_attempts)
         return exercise
     
+    async def _validate_bounded(self, exercise: Dict, sem: asyncio.Semaphore) -> Dict:
+        """Validate an exercise once a slot of the semaphore is free"""
+        async with sem:
+            return await self.validate_and_fix_exercise(exercise)
+    
     async def fix_exercise(self, exercise: Dict, error: str) -> Dict:
         """Fix exercise based on validation error"""
-        print(f"Attempting to fix exercise {exercise['exercise_number']}: {error}")
+        logger.debug("Attempting to fix exercise %s: %s", exercise['exercise_number'], error)
         
         # Keep track of what was changed to update the scenario
         changes_made = []
@@ -701,12 +852,12 @@ class ExerciseGenerator:
                 # Reduce host requirements
                 hosts = [max(1, int(h)//2) for h in exercise["hosts_list"].split(",")]
                 exercise["hosts_list"] = ",".join(map(str, hosts))
-                print(f"Reduced VLSM hosts to: {exercise['hosts_list']}")
+                logger.debug("Reduced VLSM hosts to: %s", exercise['hosts_list'])
                 changes_made.append("hosts_reduced")
             elif exercise["method"] != "vlsm":
                 # Reduce number of subnets
                 exercise["number"] = max(2, exercise["number"] // 2)
-                print(f"Reduced subnet count to: {exercise['number']}")
+                logger.debug("Reduced subnet count to: %s", exercise['number'])
                 changes_made.append("subnets_reduced")
         
         elif "invalid" in error.lower():
@@ -715,7 +866,7 @@ class ExerciseGenerator:
                 exercise["network"] = exercise["network"].replace("/24", "/22")
             elif "/22" in exercise["network"]:
                 exercise["network"] = exercise["network"].replace("/22", "/20")
-            print(f"Changed network to: {exercise['network']}")
+            logger.debug("Changed network to: %s", exercise['network'])
             changes_made.append("network_expanded")
         
         # Update scenario and requirements to reflect the changes
@@ -727,7 +878,7 @@ class ExerciseGenerator:
     async def update_exercise_description(self, exercise: Dict, changes_made: List[str], original_hosts: str, original_number: int, original_network: str) -> Dict:
         """Update exercise scenario and requirements to reflect corrections made using LLM"""
         try:
-            print(f"Updating exercise description for changes: {changes_made}")
+            logger.debug("Updating exercise description for changes: %s", changes_made)
             
             # Extract current values
             current_network = exercise.get("network", "")
@@ -735,15 +886,6 @@ class ExerciseGenerator:
             original_scenario = exercise.get("scenario", "")
             original_title = exercise.get("title", "")
             
-            # Detect language from existing scenario
-            detected_language = "English"  # default
-            if "empresa" in original_scenario.lower() or "departamento" in original_scenario.lower() or "universidad" in original_scenario.lower():
-                detected_language = "Spanish"
-            elif "entreprise" in original_scenario.lower() or "département" in original_scenario.lower() or "université" in original_scenario.lower():
-                detected_language = "French"
-            elif "unternehmen" in original_scenario.lower() or "abteilung" in original_scenario.lower() or "universität" in original_scenario.lower():
-                detected_language = "German"
-            
             # Use intelligent number substitution instead of LLM rewriting
             if "hosts_reduced" in changes_made and current_method == "vlsm":
                 current_hosts = exercise["hosts_list"]
@@ -759,9 +901,9 @@ class ExerciseGenerator:
                 exercise["scenario"] = updated_full_text
                 exercise["requirements"] = ""
                 
-                print(f"Updated scenario using smart substitution: {exercise['scenario'][:100]}...")
+                logger.debug("Updated scenario using smart substitution: %.100s...", exercise['scenario'])
                 if exercise.get("requirements"):
-                    print(f"Updated requirements: {exercise['requirements'][:100]}...")
+                    logger.debug("Updated requirements: %.100s...", exercise['requirements'])
             
             elif "subnets_reduced" in changes_made and current_method != "vlsm":
                 current_number = exercise["number"]
@@ -770,16 +912,16 @@ class ExerciseGenerator:
                 # Simple replacement for subnet count
                 exercise["scenario"] = original_scenario.replace(str(original_number), str(current_number))
                 
-                print(f"Updated scenario to reflect corrected subnet count: {current_number}")
+                logger.debug("Updated scenario to reflect corrected subnet count: %s", current_number)
             
             elif "network_expanded" in changes_made:
                 # Simple network replacement
                 exercise["scenario"] = exercise["scenario"].replace(original_network, current_network)
                 
-                print(f"Updated scenario to reflect expanded network: {current_network}")
+                logger.debug("Updated scenario to reflect expanded network: %s", current_network)
             
         except Exception as e:
-            print(f"Error updating exercise description: {e}")
+            logger.warning("Error updating exercise description: %s", e)
             # Fallback to original scenario if LLM fails
             if "scenario" not in exercise or not exercise["scenario"]:
                 exercise["scenario"] = original_scenario
@@ -788,165 +930,121 @@ class ExerciseGenerator:
     
     def smart_replace_host_numbers(self, scenario: str, new_hosts: str) -> str:
         """Replace host numbers by matching largest to largest, avoiding IP addresses"""
-        import re
-        
-        print(f"Smart replacement input - FULL Scenario: {scenario}")
-        print(f"New hosts: {new_hosts}")
+        logger.debug("Smart replacement input - FULL Scenario: %s", scenario)
+        logger.debug("New hosts: %s", new_hosts)
         
         # Convert new hosts to list and sort descending (largest first)
         new_host_list = sorted([int(h) for h in new_hosts.split(",")], reverse=True)
-        print(f"New hosts sorted (largest first): {new_host_list}")
-        
-        # First, temporarily replace IP addresses to protect them
-        ip_pattern = r'\d+\.\d+\.\d+\.\d+(?:/\d+)?'  # Match IP addresses with optional CIDR
-        ip_matches = re.findall(ip_pattern, scenario)
-        protected_scenario = scenario
-        ip_placeholders = {}
-        
-        for i, ip in enumerate(ip_matches):
-            placeholder = f"__IP_PLACEHOLDER_{i}__"
-            protected_scenario = protected_scenario.replace(ip, placeholder, 1)
-            ip_placeholders[placeholder] = ip
-            print(f"Protected IP: {ip} -> {placeholder}")
+        logger.debug("New hosts sorted (largest first): %s", new_host_list)
         
-        # Find all numbers that have spaces before and after (standalone numbers)
-        # This avoids IP addresses and other connected numbers
-        number_pattern = r'\s(\d+)\s'
-        number_matches = re.findall(number_pattern, protected_scenario)
+        # Find all standalone numbers and numbers of hosts, skipping IP addresses
+        number_matches = [m.group('num') for m in HOST_NUMBER_RE.finditer(scenario) if m.group('num')]
         
-        print(f"All numbers found: {number_matches}")
+        logger.debug("All numbers found: %s", number_matches)
         
         # Convert to integers, remove duplicates, and sort descending
-        unique_numbers = list(set([int(n) for n in number_matches if n.isdigit()]))
-        old_numbers = sorted(unique_numbers, reverse=True)
-        print(f"Old numbers sorted (largest first): {old_numbers}")
+        old_numbers = sorted({int(n) for n in number_matches}, reverse=True)
+        logger.debug("Old numbers sorted (largest first): %s", old_numbers)
         
         # Match largest old number with largest new number
-        updated_scenario = protected_scenario
-        replacements_made = 0
+        mapping = dict(zip(old_numbers, new_host_list))
+        for old_num in old_numbers[len(new_host_list):]:
+            logger.debug("No replacement value for %s", old_num)
         
-        for i, old_num in enumerate(old_numbers):
-            if i < len(new_host_list):
-                new_num = new_host_list[i]
-                
-                # Try different replacement patterns in order of specificity
-                replacement_patterns = [
-                    (f"{old_num} hosts", f"{new_num} hosts"),
-                    (f"({old_num} hosts", f"({new_num} hosts"),
-                    (f" {old_num} ", f" {new_num} "),
-                    (str(old_num), str(new_num))  # Last resort: direct number replacement
-                ]
-                
-                replaced = False
-                for old_pattern, new_pattern in replacement_patterns:
-                    if old_pattern in updated_scenario and not replaced:
-                        # Count occurrences to be careful
-                        count = updated_scenario.count(old_pattern)
-                        if count == 1:  # Only replace if there's exactly one occurrence
-                            updated_scenario = updated_scenario.replace(old_pattern, new_pattern)
-                            print(f"Replaced '{old_pattern}' with '{new_pattern}'")
-                            replacements_made += 1
-                            replaced = True
-                            break
-                        elif count > 1:
-                            # Replace only the first occurrence
-                            updated_scenario = updated_scenario.replace(old_pattern, new_pattern, 1)
-                            print(f"Replaced first occurrence of '{old_pattern}' with '{new_pattern}' ({count} total found)")
-                            replacements_made += 1
-                            replaced = True
-                            break
-                
-                if not replaced:
-                    print(f"Could not replace {old_num}")
-            else:
-                print(f"No replacement value for {old_num}")
+        def substitute(match):
+            number = match.group('num')
+            if number is None:
+                return match.group('ip')
+            return str(mapping.get(int(number), number))
         
-        # Restore IP addresses
-        for placeholder, ip in ip_placeholders.items():
-            updated_scenario = updated_scenario.replace(placeholder, ip)
-            print(f"Restored IP: {placeholder} -> {ip}")
+        # Substitute in a single pass; IP addresses are returned unchanged
+        updated_scenario = HOST_NUMBER_RE.sub(substitute, scenario)
         
-        print(f"Made {replacements_made} total replacements")
-        print(f"Final result: {updated_scenario}")
+        logger.debug("Final result: %s", updated_scenario)
         return updated_scenario
     
+    async def _fetch_image_bytes(self, image_url: str) -> bytes:
+        """Fetch image content, sharing one download per URL across concurrent callers"""
+        # Only in-flight downloads are shared: diagram URLs are unique per generation, so
+        # keeping finished ones would just hold their bytes; no lock is needed on a single event loop
+        task = self._image_downloads.get(image_url)
+        if task is None:
+            task = asyncio.ensure_future(self._http.get(image_url, timeout=30))
+            self._image_downloads[image_url] = task
+            task.add_done_callback(lambda _: self._image_downloads.pop(image_url, None))
+        
+        response = await task
+        response.raise_for_status()
+        return response.content
+    
+    async def _download_image(self, image_url: str, index: int) -> Optional[tuple[str, bytes]]:
+        """Download a diagram, returning its archive filename and content or None on failure"""
+        try:
+            logger.debug("Downloading image %s: %s", index, image_url)
+            
+            # Determine file extension
+            if image_url.lower().endswith('.svg'):
+                ext = '.svg'
+            else:
+                ext = '.png'
+            
+            # Create local filename
+            image_filename = f"diagram_{index}{ext}"
+            
+            image_bytes = await self._fetch_image_bytes(image_url)
+            
+            logger.debug("Downloaded: %s", image_filename)
+            return image_filename, image_bytes
+            
+        except Exception as img_error:
+            logger.warning("Failed to download image %s: %s", index, img_error)
+            return None
+    
     async def create_zip_with_images(self, markdown_content: str, image_urls: List[str]) -> str:
         """Create ZIP file with markdown and downloaded images"""
         try:
-            # Create temporary directory for files
-            temp_dir = tempfile.mkdtemp()
+            # Download all images concurrently, then update markdown
+            downloaded = await asyncio.gather(
+                *(self._download_image(image_url, i) for i, image_url in enumerate(image_urls, 1))
+            )
+            url_to_file = {url: image[0] for url, image in zip(image_urls, downloaded) if image}
             
-            # Download images and update markdown
+            # Rewrite all downloaded URLs to their local files in one pass (longest first, so
+            # a URL that prefixes another never shadows it)
             updated_markdown = markdown_content
-            image_files = []
+            if url_to_file:
+                url_re = re.compile('|'.join(map(re.escape, sorted(url_to_file, key=len, reverse=True))))
+                updated_markdown = url_re.sub(lambda m: url_to_file[m.group(0)], markdown_content)
             
-            for i, image_url in enumerate(image_urls, 1):
-                try:
-                    print(f"Downloading image {i}: {image_url}")
-                    response = requests.get(image_url, timeout=30)
-                    response.raise_for_status()
-                    
-                    # Determine file extension
-                    if image_url.lower().endswith('.svg'):
-                        ext = '.svg'
-                    else:
-                        ext = '.png'
-                    
-                    # Create local filename
-                    image_filename = f"diagram_{i}{ext}"
-                    image_path = Path(temp_dir) / image_filename
-                    
-                    # Save image
-                    with open(image_path, 'wb') as f:
-                        f.write(response.content)
-                    
-                    # Update markdown to reference local file
-                    updated_markdown = updated_markdown.replace(image_url, image_filename)
-                    image_files.append(image_filename)
-                    
-                    print(f"Downloaded: {image_filename}")
-                    
-                except Exception as img_error:
-                    print(f"Failed to download image {i}: {img_error}")
-            
-            # Save updated markdown
-            markdown_filename = "exercises.md"
-            markdown_path = Path(temp_dir) / markdown_filename
-            with open(markdown_path, 'w', encoding='utf-8') as f:
-                f.write(updated_markdown)
-            
-            # Create ZIP file
+            # Create ZIP file, writing the markdown and images straight from memory
             zip_filename = tempfile.NamedTemporaryFile(suffix=".zip", delete=False)
             zip_path = zip_filename.name
             zip_filename.close()
             
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as zipf:
                 # Add markdown file
-                zipf.write(markdown_path, markdown_filename)
+                zipf.writestr("exercises.md", updated_markdown)
                 
-                # Add image files
-                for image_file in image_files:
-                    image_path = Path(temp_dir) / image_file
-                    if image_path.exists():
-                        zipf.write(image_path, image_file)
-            
-            print(f"Created ZIP: {zip_path}")
+                # Add image files; PNGs are already deflate-compressed, so store them as-is
+                for image in downloaded:
+                    if image:
+                        image_filename, image_bytes = image
+                        compress_type = zipfile.ZIP_STORED if image_filename.endswith('.png') else zipfile.ZIP_DEFLATED
+                        zipf.writestr(image_filename, image_bytes, compress_type=compress_type)
             
-            # Clean up temp directory
-            import shutil
-            shutil.rmtree(temp_dir)
+            logger.debug("Created ZIP: %s", zip_path)
             
             return zip_path
             
         except Exception as e:
-            print(f"Error creating ZIP: {e}")
+            logger.warning("Error creating ZIP: %s", e)
             return ""
     
     async def generate_diagram_for_exercise(self, exercise: Dict) -> tuple[str, str]:
         """Generate network diagram for exercise using requested hosts, not optimal calculated hosts"""
         """Returns tuple of (markdown_for_display, image_url_for_download)"""
         try:
-            print(f"Generating diagram for exercise {exercise['exercise_number']}")
+            logger.debug("Generating diagram for exercise %s", exercise['exercise_number'])
             
             # Use the original requested hosts from the exercise, not the optimal calculated ones
             if exercise["method"] == "vlsm":
@@ -955,29 +1053,23 @@ class ExerciseGenerator:
             else:
                 # For max_subnets and max_hosts_per_subnet, we need to extract the original requirement
                 # Parse the requirements to find the requested host count
-                requirements = exercise.get("requirements", "").lower()
+                requirements = exercise.get("requirements", "")
                 hosts_requested = None
                 
                 # Look for host requirements in the requirements text
-                import re
-                host_matches = re.findall(r'(\d+)\s*hosts?', requirements) if requirements else []
-                if host_matches:
-                    # Use the first host count found
-                    hosts_requested = int(host_matches[0])
-                else:
+                hosts_requested = first_host_count(requirements, HOSTS_REQ_RE)
+                if hosts_requested is None:
                     # Fallback: look in scenario text
-                    scenario = exercise.get("scenario", "").lower()
-                    host_matches = re.findall(r'(\d+)\s*(?:hosts?|dispositivos?|devices?)', scenario) if scenario else []
-                    if host_matches:
-                        hosts_requested = int(host_matches[0])
+                    scenario = exercise.get("scenario", "")
+                    hosts_requested = first_host_count(scenario, HOSTS_MULTI_RE)
                 
                 if hosts_requested:
                     # Create host list with the requested count for each subnet
                     num_subnets = exercise.get("number", 2)
                     hosts_list = ",".join([str(hosts_requested)] * num_subnets)
-                    print(f"Using requested hosts: {hosts_list} instead of optimal calculation")
+                    logger.debug("Using requested hosts: %s instead of optimal calculation", hosts_list)
                 else:
-                    print("Could not find requested host count, falling back to calculated optimal")
+                    logger.debug("Could not find requested host count, falling back to calculated optimal")
                     # Fallback to calculated hosts if we can't parse the requirement
                     tool_args = {
                         "network": exercise["network"],
@@ -1012,15 +1104,57 @@ class ExerciseGenerator:
                 return "![Diagram not available]", ""
                 
         except Exception as e:
-            print(f"Error generating diagram: {e}")
+            logger.warning("Error generating diagram: %s", e)
             return "![Diagram generation error]", ""
     
+    async def _generate_and_validate(self, num_exercises: int, difficulty: str, language: str, template: str, progress=None) -> tuple[List[Dict], List[Any]]:
+        """Stream exercises from the LLM and validate them as one batch over a single MCP session"""
+        exercises = []
+        seen = set()
+        validation_tasks = []
+        validation_sem = asyncio.Semaphore(VALIDATION_CONCURRENCY)
+        
+        async with self.mcp_client.session("ipmentor") as session:
+            session_tools = await load_mcp_tools(session)
+            token = batch_tools.set({tool.name: tool for tool in session_tools})
+            results_token = batch_results.set({})
+            try:
+                try:
+                    async for exercise in self.generate_exercises_with_llm(num_exercises, difficulty, language, template):
+                        # Skip exercises the LLM repeated with the same network and requirements
+                        key = tuple(str(exercise.get(field)) for field in ("network", "method", "number", "hosts_list"))
+                        if key in seen:
+                            logger.debug("Skipping duplicate exercise %s", exercise["exercise_number"])
+                            continue
+                        seen.add(key)
+                        exercises.append(exercise)
+                        validation_tasks.append(asyncio.create_task(self._validate_bounded(exercise, validation_sem)))
+                except BaseException:
+                    for task in validation_tasks:
+                        task.cancel()
+                    raise
+                
+                # Report validations in completion order as they finish
+                total = len(validation_tasks)
+                for completed, next_done in enumerate(asyncio.as_completed(validation_tasks), 1):
+                    try:
+                        await next_done
+                    except Exception:
+                        pass  # Collected per task below
+                    if progress is not None:
+                        progress(0.6 + 0.2 * completed / total, desc=f"Validated exercise {completed}/{total}...")
+                results = [task.exception() or task.result() for task in validation_tasks]
+            finally:
+                batch_results.reset(results_token)
+                batch_tools.reset(token)
+        
+        return exercises, results
+    
     async def generate_complete_exercises(self, num_exercises: int, difficulty: str, language: str, template: str, progress=None) -> tuple[str, str, str]:
         """Generate, validate and create complete exercises with diagrams"""
         try:
-            print(f"=== Starting exercise generation ===")
-            print(f"Inputs: {num_exercises} exercises, {difficulty}, {language}")
-            print(f"Template length: {len(template) if template else 0}")
+            logger.info("Starting exercise generation: %d exercises, %s, %s", num_exercises, difficulty, language)
+            logger.debug("Template length: %d", len(template) if template else 0)
             # Connect to IPMentor if not connected
             if self.connection_status != "Connected":
                 if progress is not None:
@@ -1029,73 +1163,64 @@ class ExerciseGenerator:
                 if self.connection_status != "Connected":
                     return f"❌ Failed to connect to IPMentor: {connect_result}", "", ""
             
-            # Generate exercises with LLM
+            # Generate exercises with LLM, validating each one as soon as it is streamed
             if progress is not None:
                 progress(0.5, desc="Generating exercises with AI...")
-            print(f"Generating {num_exercises} exercises with {difficulty} difficulty in {language}")
+            logger.debug("Generating %d exercises with %s difficulty in %s", num_exercises, difficulty, language)
             
             try:
-                exercises = self.generate_exercises_with_llm(num_exercises, difficulty, language, template)
-                print(f"LLM returned {len(exercises) if exercises else 0} exercises")
+                exercises, results = await self._generate_and_validate(num_exercises, difficulty, language, template, progress)
+                logger.info("LLM returned %d exercises", len(exercises))
             except Exception as llm_error:
-                print(f"LLM generation failed: {llm_error}")
-                import traceback
-                print(f"LLM error traceback: {traceback.format_exc()}")
+                logger.exception("LLM generation failed: %s", llm_error)
                 return f"❌ LLM generation failed: {str(llm_error)}", "", ""
             
             if not exercises:
-                print("No exercises returned from LLM")
+                logger.warning("No exercises returned from LLM")
                 return "❌ Failed to generate exercises", "", ""
             
-            # Validate and fix each exercise
-            if progress is not None:
-                progress(0.6, desc="Validating exercises...")
             validated_exercises = []
-            for i, exercise in enumerate(exercises):
-                try:
-                    if progress is not None:
-                        progress(0.6 + (0.2 * i / len(exercises)), desc=f"Validating exercise {i+1}/{len(exercises)}...")
-                    validated_exercise = await self.validate_and_fix_exercise(exercise)
-                    if validated_exercise:
-                        validated_exercises.append(validated_exercise)
-                except Exception as validation_error:
-                    print(f"Error validating exercise {i+1}: {validation_error}")
+            for i, (exercise, result) in enumerate(zip(exercises, results)):
+                if isinstance(result, Exception):
+                    logger.warning("Error validating exercise %d: %s", i + 1, result)
                     # Still add the original exercise if validation fails completely
                     validated_exercises.append(exercise)
+                elif result:
+                    validated_exercises.append(result)
             
             # Generate diagrams and create markdown content
             if progress is not None:
                 progress(0.8, desc="Generating network diagrams...")
             markdown_content, image_urls = await self.create_markdown_content_with_diagrams(validated_exercises, language, progress)
             
-            # Generate PDF
+            # Generate PDF and ZIP (markdown and images) concurrently
             if progress is not None:
                 progress(0.95, desc="Creating PDF document...")
             with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp_pdf:
                 pdf_path = tmp_pdf.name
             
-            try:
-                markdown_to_pdf(markdown_content, pdf_path)
-                pdf_success = True
-            except Exception as e:
-                print(f"PDF generation failed: {e}")
-                pdf_success = False
+            pdf_task = asyncio.to_thread(markdown_to_pdf, markdown_content, pdf_path)
+            if markdown_content and not markdown_content.startswith("❌"):
+                zip_task = self.create_zip_with_images(markdown_content, image_urls)
+            else:
+                zip_task = asyncio.sleep(0, result="")
+            pdf_result, zip_result = await asyncio.gather(pdf_task, zip_task, return_exceptions=True)
+            
+            pdf_success = not isinstance(pdf_result, Exception)
+            if not pdf_success:
+                logger.error("PDF generation failed: %s", pdf_result)
                 pdf_path = ""
             
-            # Create ZIP file with markdown and images
             zip_path = ""
-            if markdown_content and not markdown_content.startswith("❌"):
-                try:
-                    zip_path = await self.create_zip_with_images(markdown_content, image_urls)
-                except Exception as zip_error:
-                    print(f"ZIP creation failed: {zip_error}")
+            if isinstance(zip_result, Exception):
+                logger.error("ZIP creation failed: %s", zip_result)
+            else:
+                zip_path = zip_result
             
             return markdown_content, pdf_path if pdf_success else "", zip_path
             
         except Exception as e:
-            import traceback
-            full_traceback = traceback.format_exc()
-            print(f"FULL ERROR TRACEBACK: {full_traceback}")
+            logger.exception("Error generating exercises: %s", e)
             return f"❌ Error generating exercises: {str(e)}", "", ""
     
     async def create_markdown_content_with_diagrams(self, exercises: List[Dict], language: str, progress=None) -> str:
@@ -1146,21 +1271,15 @@ class ExerciseGenerator:
         
         labels = field_labels.get(language, field_labels["English"])
         
-        markdown_lines = [
-            titles.get(language, titles["English"]),
-            "",
-            f"*{labels['powered_by']}*",
-            "",
-            "---",
-            ""
-        ]
+        parts = [f"{titles.get(language, titles['English'])}\n\n*{labels['powered_by']}*\n\n---\n"]
         
         image_urls = []
+        network_suffix = NETWORK_SUFFIXES.get(language, NETWORK_SUFFIXES["English"])
         
         for i, exercise in enumerate(exercises, 1):
             if progress is not None:
                 progress(0.8 + (0.1 * i / len(exercises)), desc=f"Generating diagram for exercise {i}/{len(exercises)}...")
-            print(f"Generating diagram for exercise {i}")
+            logger.debug("Generating diagram for exercise %d", i)
             
             # Generate the actual diagram
             diagram_markdown, image_url = await self.generate_diagram_for_exercise(exercise)
@@ -1184,31 +1303,15 @@ class ExerciseGenerator:
             
             # Add network information to the statement if not already included
             if network and network not in unified_statement:
-                if language == "Spanish":
-                    unified_statement += f" Tienen asignado el direccionamiento {network}."
-                elif language == "French":
-                    unified_statement += f" Ils ont l'adressage {network} assigné."
-                elif language == "German":
-                    unified_statement += f" Sie haben die Adressierung {network} zugewiesen."
-                else:
-                    unified_statement += f" They have been assigned the network {network}."
+                unified_statement += network_suffix.format(network=network)
             
             # Create fallback title
             fallback_title = f"{labels['exercise']} {i}"
             exercise_title = exercise.get('title', fallback_title)
             
-            markdown_lines.extend([
-                f"## {labels['exercise']} {i}: {exercise_title}",
-                "",
-                unified_statement,
-                "",
-                diagram_markdown,
-                "",
-                "---",
-                ""
-            ])
+            parts.append(f"## {labels['exercise']} {i}: {exercise_title}\n\n{unified_statement}\n\n{diagram_markdown}\n\n---\n")
         
-        return "\n".join(markdown_lines), image_urls
+        return "\n".join(parts), image_urls
 
 # Global instance
 generator = ExerciseGenerator()
@@ -1219,35 +1322,29 @@ async def generate_exercises_async(num_exercises, difficulty, language, template
     """Async wrapper for exercise generation"""
     return await generator.generate_complete_exercises(num_exercises, difficulty, language, template, progress)
 
-def generate_exercises(num_exercises, difficulty, language, template, progress=None):
+async def generate_exercises(num_exercises, difficulty, language, template, progress=None):
     """Generate exercises with validation and diagrams"""
     try:
         # Validate inputs
         if not isinstance(num_exercises, int) or num_exercises <= 0:
-            return "❌ Error: Invalid number of exercises", None
+            return "❌ Error: Invalid number of exercises", None, None
         if not language or language not in ["English", "Spanish", "French", "German"]:
-            return "❌ Error: Invalid language selection", None
+            return "❌ Error: Invalid language selection", None, None
         if not difficulty or difficulty not in ["easy", "medium", "difficult"]:
-            return "❌ Error: Invalid difficulty level", None
+            return "❌ Error: Invalid difficulty level", None, None
             
-        # Run async function
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            if progress is not None:
-                progress(0.3, desc="Connecting to IPMentor...")
-            markdown_content, pdf_path, zip_path = loop.run_until_complete(
-                generate_exercises_async(num_exercises, difficulty, language, template, progress)
-            )
-        finally:
-            loop.close()
+        # Runs on Gradio's event loop, so the async clients keep their pooled connections
+        if progress is not None:
+            progress(0.3, desc="Connecting to IPMentor...")
+        markdown_content, pdf_path, zip_path = await generate_exercises_async(
+            num_exercises, difficulty, language, template, progress
+        )
         
         return markdown_content, pdf_path if pdf_path else None, zip_path if zip_path else None
         
     except Exception as e:
-        import traceback
         error_msg = f"❌ Error: {str(e)}"
-        print(f"Full error traceback: {traceback.format_exc()}")
+        logger.exception("Error generating exercises: %s", e)
         return error_msg, None, None
 
 def create_interface():
@@ -1323,18 +1420,20 @@ def create_interface():
             """Update template based on selected language"""
             return DEFAULT_TEMPLATES.get(language, DEFAULT_TEMPLATES["English"])
         
-        def handle_generation(num_ex, diff, lang, templ, progress=gr.Progress()):
+        async def handle_generation(num_ex, diff, lang, templ, progress=gr.Progress()):
             progress(0, desc="Starting exercise generation...")
             
             progress(0.2, desc="Generating realistic scenarios...")
-            markdown, pdf, zip_file = generate_exercises(num_ex, diff, lang, templ, progress)
+            markdown, pdf, zip_file = await generate_exercises(num_ex, diff, lang, templ, progress)
             
             progress(1.0, desc="Complete!")
             
-            pdf_file = gr.File(value=pdf, visible=True) if pdf else gr.File(visible=False)
-            zip_file_ui = gr.File(value=zip_file, visible=True) if zip_file else gr.File(visible=False)
-            
-            return markdown, pdf_file, zip_file_ui
+            # Update the existing file outputs rather than building new components per request
+            return (
+                markdown,
+                gr.update(value=pdf, visible=bool(pdf)),
+                gr.update(value=zip_file, visible=bool(zip_file))
+            )
         
         # Update template when language changes
         language.change(
@@ -1355,10 +1454,12 @@ def create_interface():
 # MAIN APPLICATION
 
 if __name__ == "__main__":
+    logging.basicConfig(level=os.getenv("LOGLEVEL", "INFO"))
+    
     # Check environment variables
     if not os.getenv("OPENROUTER_API_KEY"):
-        print("⚠️  Warning: OPENROUTER_API_KEY not found. Please configure it in your .env file")
-        print("   Get your API key from: https://openrouter.ai/")
+        logger.warning("⚠️  OPENROUTER_API_KEY not found. Please configure it in your .env file")
+        logger.warning("   Get your API key from: https://openrouter.ai/")
     
     # Create and launch interface
     interface = create_interface()
@@ -9,28 +9,105 @@ Powered by Mistral Small 3.1 24B Instruct model.
 """
 
 import asyncio
+import atexit
+import importlib.util
 import os
+import tempfile
 import json
+import logging
+import re
+import time
 from typing import Any, Generator
 from dotenv import load_dotenv
 
+import httpx
+
 import gradio as gr
 from gradio import ChatMessage
-from openai import OpenAI
+from openai import NOT_GIVEN, AsyncOpenAI
 
 # MCP imports
 from langchain_mcp_adapters.client import MultiServerMCPClient
 
+# The caches live in the sibling llm_cache module; without it every request goes to the model
+try:
+    from llm_cache import LLMCache, SemanticCache
+except ImportError:
+    LLMCache = SemanticCache = None
+
+# orjson is optional; the stdlib json module is used when it is not installed
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    orjson = None
+    json_loads = json.loads
+
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 ##########################################################
 # GLOBAL CONFIGURATION
 ##########################################################
 
+# OpenRouter settings, read once at import
+DEFAULT_OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL") or DEFAULT_OPENROUTER_BASE_URL
+
 # Control whether to show tool execution details
 SHOW_TOOLS = True  # True: shows tool details, False: only typing and response
 
+# Concurrent agent runs (bounded by OpenRouter rate limits) and pending requests allowed in the queue
+QUEUE_CONCURRENCY = int(os.getenv("QUEUE_CONCURRENCY", "8"))
+QUEUE_MAX_SIZE = int(os.getenv("QUEUE_MAX_SIZE", "64"))
+
+# Example queries offered in the UI
+EXAMPLES = [
+    "Analyze the IP 192.168.1.100/24",
+    "Calculate 4 subnets for the network 10.0.0.0/16",
+    "Generate a diagram of the network 172.16.0.0/20 with 8 subnets",
+    "What is the broadcast address of 192.168.50.0/26?",
+    "Divide the network 10.10.0.0/22 into subnets of 100 hosts each"
+]
+
+# Sampling temperature; unset keeps the provider default. Completions are only cached when it is 0
+TEMPERATURE = float(os.environ["LLM_TEMPERATURE"]) if os.getenv("LLM_TEMPERATURE") else None
+
+# Directory for the persistent LLM caches; /data is the persistent storage of Hugging Face Spaces
+CACHE_DIR = os.getenv("LLM_CACHE_DIR") or ("/data" if os.path.isdir("/data") else tempfile.gettempdir())
+
+# Opt-in: answer paraphrased prompts from earlier answers (needs sentence-transformers and faiss)
+SEMANTIC_CACHE_ENABLED = (
+    os.getenv("SEMANTIC_CACHE", "0") == "1" and SemanticCache is not None and SemanticCache.available()
+)
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+
+# Numbers, addresses and prefixes in a prompt; a cached answer is only reused when they all match
+_NUMERIC_TOKENS_RE = re.compile(r'\d+(?:[./]\d+)*')
+
+# Words that pick the quantity or tool asked for; a cached answer is only reused when the same ones appear,
+# so "broadcast address of X" never answers "network address of X"
+_INTENT_WORDS_RE = re.compile(
+    r'\b(?:broadcast|network|first|last|usable|range|hosts?|subnets?|mask|wildcard|prefix|cidr|vlsm|diagram|class)\b',
+    re.IGNORECASE
+)
+
+# Maximum number of conversation messages (excluding the system prompt) sent to the model
+MAX_HISTORY_MESSAGES = 40
+
+# Minimum seconds between chat updates while a response is streaming
+STREAM_UPDATE_INTERVAL = 0.05
+
+# Prefix of a JSON list of tool calls written into the message content
+_FAKE_TOOLS_RE = re.compile(r'\[\s*\{[^{]*"name"\s*:')
+
+# History roles forwarded to the model, and component contents that are skipped
+_ALLOWED_ROLES = frozenset(("user", "assistant"))
+_SKIP_TYPES = (gr.Image, gr.File)
+
 # Fixed MCP server URL for the demo
 DEMO_MCP_SERVER_URL = "https://davidlms-ipmentor.hf.space/gradio_api/mcp/sse"
 
@@ -40,17 +117,47 @@ def load_system_prompt():
         with open("chatbot_system_prompt.md", "r", encoding="utf-8") as f:
             return f.read()
     except FileNotFoundError:
-        print("Warning: examples/chatbot_system_prompt.md not found, using default prompt")
+        logger.warning("chatbot_system_prompt.md not found, using default prompt")
         return "You are an IPv4 networking assistant specialized in subnetting calculations and network analysis."
 
-SYSTEM_PROMPT = load_system_prompt()
+# System message shared by every request; never mutated
+SYSTEM_MESSAGE = {"role": "system", "content": load_system_prompt()}
+
+# Shared by every session; the embedding model is only loaded on the first lookup
+semantic_cache = (
+    SemanticCache(threshold=SEMANTIC_CACHE_THRESHOLD, path=os.path.join(CACHE_DIR, "ipmentor_semantic_cache"))
+    if SEMANTIC_CACHE_ENABLED else None
+)
+if semantic_cache is not None:
+    atexit.register(semantic_cache.save)
 
 ##########################################################
 # UTILITY FUNCTIONS
 ##########################################################
 
+_JSON_SCALAR_TYPES = (str, int, float, bool, type(None))
+
+def _is_json_safe(obj) -> bool:
+    """Check iteratively whether obj is built only from dicts, lists and JSON scalars."""
+    stack = [obj]
+    seen = set()
+    while stack:
+        item = stack.pop()
+        if isinstance(item, (dict, list)):
+            # Shared or circular containers go through the regular path
+            if id(item) in seen:
+                return False
+            seen.add(id(item))
+            stack.extend(item.values() if isinstance(item, dict) else item)
+        elif not isinstance(item, _JSON_SCALAR_TYPES):
+            return False
+    return True
+
 def safe_json_serialize(obj):
     """Safely serialize an object to JSON, handling non-serializable types."""
+    # Already JSON-safe payloads (e.g. parsed tool results) are returned as they are
+    if _is_json_safe(obj):
+        return obj
     try:
         if isinstance(obj, (str, int, float, bool, type(None))):
             return obj
@@ -76,32 +183,84 @@ def safe_json_serialize(obj):
 def safe_json_dumps(obj, **kwargs):
     """Safe JSON dumps that handles non-serializable objects."""
     try:
-        return json.dumps(safe_json_serialize(obj), **kwargs)
+        data = safe_json_serialize(obj)
+        # orjson never escapes non-ASCII and only indents by two spaces, so use it when that is what was asked for
+        if (orjson is not None and kwargs.keys() <= {"ensure_ascii", "indent"}
+                and kwargs.get("ensure_ascii") is False and kwargs.get("indent") in (None, 2)):
+            option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if kwargs.get("indent") else 0)
+            try:
+                return orjson.dumps(data, option=option).decode()
+            except orjson.JSONEncodeError:
+                # e.g. integers beyond 64 bits; let the stdlib handle them
+                pass
+        return json.dumps(data, **kwargs)
     except Exception as e:
         return json.dumps({"error": f"Error serializing: {str(e)}", "data": str(obj)}, **kwargs)
 
+def _to_role_content(msg):
+    """Return (role, content) for a history message given as a dict or a message object."""
+    if type(msg) is dict:
+        return msg.get("role"), msg.get("content")
+    try:
+        return msg.role, msg.content
+    except AttributeError:
+        return None, None
+
+def _resolve_tool_invoker(tool):
+    """Return an async callable taking the tool arguments dict, or None if the tool can't be called."""
+    if hasattr(tool, 'ainvoke'):
+        return tool.ainvoke
+    if hasattr(tool, 'acall'):
+        return tool.acall
+    if hasattr(tool, 'func'):
+        # Plain functions run in a worker thread to keep the event loop free
+        return lambda tool_args: asyncio.to_thread(tool.func, **tool_args)
+    return None
+
 ##########################################################
 # MODEL AND MCP CONFIGURATION
 ##########################################################
 
+# OpenAI client for OpenRouter, created once per process and shared by every request so
+# connections stay alive across turns and sessions (HTTP/2 when the h2 package is installed)
+openai_client = AsyncOpenAI(
+    api_key=OPENROUTER_API_KEY,
+    base_url=OPENROUTER_BASE_URL,
+    http_client=httpx.AsyncClient(
+        http2=importlib.util.find_spec("h2") is not None,
+        limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+        timeout=httpx.Timeout(60.0, connect=5.0)
+    ),
+    timeout=httpx.Timeout(60.0, connect=5.0),
+    max_retries=1
+)
+
 class MCPClientWrapper:
     def __init__(self):
         self.mcp_client = None
         self.tools = []
+        self._tool_invokers = {}
+        self._tool_name_set = frozenset()
+        self._tool_names = ()
         self.connection_status = "Disconnected"
         self.server_url = DEMO_MCP_SERVER_URL
+        self.base_url = self.server_url.replace('/gradio_api/mcp/sse', '')
         
-        # Configure OpenAI client for OpenRouter
-        self.openai_client = OpenAI(
-            api_key=os.getenv("OPENROUTER_API_KEY"),
-            base_url=os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1"),
-        )
+        self.openai_client = openai_client
         self.model_name = "mistralai/mistral-small-3.1-24b-instruct"
+        # Only deterministic completions are cached, so the store is only opened for temperature 0
+        self.llm_cache = (
+            LLMCache(path=os.path.join(CACHE_DIR, "ipmentor_llm_cache.sqlite3"))
+            if TEMPERATURE == 0 and LLMCache is not None else None
+        )
     
     async def connect_async(self) -> str:
         """Connect to the demo MCP server"""
         try:
-            print(f"Attempting to connect to demo server: {self.server_url}")
+            logger.debug("Attempting to connect to demo server: %s", self.server_url)
+            
+            # Drop tools cached from a previous connection
+            self._tool_invokers = {}
             
             # Configure MCP client
             self.mcp_client = MultiServerMCPClient({
@@ -111,14 +270,15 @@ class MCPClientWrapper:
                 }
             })
             
-            print("MCP client configured, getting tools...")
+            logger.debug("MCP client configured, getting tools...")
             
             # Get available tools
             mcp_tools = await self.mcp_client.get_tools()
+            self._tool_invokers = {tool.name: _resolve_tool_invoker(tool) for tool in mcp_tools}
             
-            print(f"Tools obtained: {len(mcp_tools)}")
+            logger.debug("Tools obtained: %d", len(mcp_tools))
             for tool in mcp_tools:
-                print(f"- {tool.name}: {tool.description}")
+                logger.debug("- %s: %s", tool.name, tool.description)
             
             # Convert tools to OpenAI format
             self.tools = []
@@ -146,7 +306,7 @@ class MCPClientWrapper:
                             input_schema = serialized_schema
                         
                 except Exception as e:
-                    print(f"Warning: Could not serialize schema for {tool.name}: {e}")
+                    logger.warning("Could not serialize schema for %s: %s", tool.name, e)
                 
                 tool_def = {
                     "type": "function",
@@ -157,29 +317,41 @@ class MCPClientWrapper:
                     }
                 }
                 self.tools.append(tool_def)
-                print(f"Tool converted: {tool.name}")
-                print(f"  Schema: {json.dumps(input_schema, indent=2)[:200]}...")
+                logger.debug("Tool converted: %s", tool.name)
             
             tool_names = [tool["function"]["name"] for tool in self.tools]
+            self._tool_name_set = frozenset(tool_names)
+            # Sorted once here for the LLM cache keys
+            self._tool_names = tuple(sorted(tool_names))
             self.connection_status = "Connected"
             return f"✅ Connected to IPMentor demo server. Available tools: {', '.join(tool_names)}"
             
         except Exception as e:
-            print(f"Detailed connection error: {type(e).__name__}: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            # The traceback is only formatted when debug logging is enabled
+            logger.error("Detailed connection error: %s: %s", type(e).__name__, e,
+                         exc_info=logger.isEnabledFor(logging.DEBUG))
             self.connection_status = "Error"
             return f"❌ Connection error: {str(e)}"
     
-    def connect(self) -> str:
-        """Synchronous wrapper for connecting"""
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            result = loop.run_until_complete(self.connect_async())
-            return result
-        finally:
-            loop.close()
+    def _convert_history(self, history) -> list:
+        """Convert Gradio history to OpenAI format"""
+        # Built fresh on every turn: the wrapper is shared by all sessions, so no history is kept on it
+        openai_history = []
+        for msg in history:
+            msg_role, msg_content = _to_role_content(msg)
+            
+            if msg_role in _ALLOWED_ROLES and msg_content:
+                # Only skip if it's gr.Image or gr.File
+                if isinstance(msg_content, _SKIP_TYPES):
+                    logger.debug("  Skipping Gradio component: %s", type(msg_content).__name__)
+                    continue
+                
+                content_str = str(msg_content).strip()
+                if content_str:
+                    logger.debug("  ✅ Adding [%s]: %.30s...", msg_role, content_str)
+                    openai_history.append({"role": msg_role, "content": content_str})
+        
+        return openai_history
     
     async def call_tool_async(self, tool_name: str, tool_args: dict) -> Any:
         """Call a tool from the MCP server"""
@@ -187,36 +359,19 @@ class MCPClientWrapper:
             if not self.mcp_client:
                 return {"error": "MCP client not initialized"}
             
-            print(f"Calling tool {tool_name} with arguments: {tool_args}")
-            
-            # Find the tool in available tools
-            mcp_tools = await self.mcp_client.get_tools()
-            tool_to_call = None
+            logger.debug("Calling tool %s with arguments: %s", tool_name, tool_args)
             
-            for tool in mcp_tools:
-                if tool.name == tool_name:
-                    tool_to_call = tool
-                    break
-            
-            if not tool_to_call:
+            # Look up the invocation method resolved at connect time
+            if tool_name not in self._tool_invokers:
                 return {"error": f"Tool {tool_name} not found"}
+            invoker = self._tool_invokers[tool_name]
+            if invoker is None:
+                return {"error": f"No compatible method found for tool {tool_name}"}
             
-            # Try calling the tool with the most common method
-            result = None
             try:
-                if hasattr(tool_to_call, 'ainvoke'):
-                    result = await tool_to_call.ainvoke(tool_args)
-                    print(f"✅ Success with ainvoke() method")
-                elif hasattr(tool_to_call, 'acall'):
-                    result = await tool_to_call.acall(tool_args)
-                    print(f"✅ Success with acall() method")
-                elif hasattr(tool_to_call, 'func'):
-                    result = tool_to_call.func(**tool_args)
-                    print(f"✅ Success with func() method")
-                else:
-                    return {"error": f"No compatible method found for tool {tool_name}"}
+                result = await invoker(tool_args)
             except Exception as e:
-                print(f"Error calling tool {tool_name}: {e}")
+                logger.warning("Error calling tool %s: %s", tool_name, e)
                 return {"error": f"Error executing tool {tool_name}: {str(e)}"}
             
             # Process result according to its type
@@ -228,14 +383,11 @@ class MCPClientWrapper:
                 # Extract file path from URL and build proper image URL
                 if '/gradio_api/file=' in image_url:
                     file_path = image_url.split('/gradio_api/file=')[1]
-                    # Get base URL from current MCP server URL
-                    base_url = self.server_url.replace('/gradio_api/mcp/sse', '') if hasattr(self, 'server_url') else ''
-                    
                     # Determine format from file extension, not status message
                     file_format = "svg" if file_path.lower().endswith('.svg') else "png"
                     
                     return {
-                        "image_path": f"{base_url}/gradio_api/file={file_path}",
+                        "image_path": f"{self.base_url}/gradio_api/file={file_path}",
                         "status": status_msg,
                         "format": file_format
                     }
@@ -245,15 +397,16 @@ class MCPClientWrapper:
             # Handle string results (JSON from other tools)
             try:
                 if isinstance(result, str):
-                    parsed_result = json.loads(result)
+                    parsed_result = json_loads(result)
                     # Check if this is a generate_diagram result in JSON format
                     if isinstance(parsed_result, dict) and "image_path" in parsed_result:
-                        # Get base URL from current MCP server URL
-                        base_url = self.server_url.replace('/gradio_api/mcp/sse', '') if hasattr(self, 'server_url') else ''
                         # Update image path to full URL if it's a relative path
                         if not parsed_result["image_path"].startswith(('http://', 'https://')):
-                            if base_url:
-                                parsed_result["image_path"] = f"{base_url}/gradio_api/file={parsed_result['image_path']}"
+                            if self.base_url:
+                                parsed_result["image_path"] = f"{self.base_url}/gradio_api/file={parsed_result['image_path']}"
+                    elif isinstance(parsed_result, dict):
+                        # Unchanged payload: keep the tool's own JSON text for display
+                        return {"_raw": result, "_parsed": parsed_result}
                     return safe_json_serialize(parsed_result)
                 else:
                     return safe_json_serialize(result)
@@ -261,16 +414,15 @@ class MCPClientWrapper:
                 return {"result": str(result)}
             
         except Exception as e:
-            print(f"Detailed error in call_tool_async: {type(e).__name__}: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.error("Detailed error in call_tool_async: %s: %s", type(e).__name__, e,
+                         exc_info=logger.isEnabledFor(logging.DEBUG))
             return {"error": f"Error calling tool {tool_name}: {str(e)}"}
     
     async def process_message_async(self, message: str, history) -> Generator:
         """Process message using OpenAI + MCP tools with agentic loop"""
         # Auto-connect if not connected
         if self.connection_status != "Connected":
-            print("Auto-connecting to demo server...")
+            logger.debug("Auto-connecting to demo server...")
             connect_result = await self.connect_async()
             if self.connection_status != "Connected":
                 yield history + [{"role": "assistant", "content": f"❌ Failed to connect to demo server: {connect_result}"}]
@@ -282,41 +434,28 @@ class MCPClientWrapper:
         # Immediately show user message
         yield current_history
         
-        # Convert history to OpenAI format
-        openai_messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+        # Convert history to OpenAI format, keeping only the most recent messages
+        conversation = self._convert_history(history) + [{"role": "user", "content": message}]
+        logger.debug("  ✅ Adding current message [user]: %.30s...", message)
+        openai_messages = [SYSTEM_MESSAGE] + conversation[-MAX_HISTORY_MESSAGES:]
+        logger.debug("📋 Gradio history: %d messages, OpenAI history: %d messages", len(history), len(openai_messages))
         
-        for msg in history:
-            # Handle both dictionaries and message objects
-            msg_role = msg.get("role") if isinstance(msg, dict) else getattr(msg, 'role', None)
-            msg_content = msg.get("content") if isinstance(msg, dict) else getattr(msg, 'content', None)
-            
-            if msg_role in ["user", "assistant"] and msg_content:
-                # Only skip if it's gr.Image or gr.File
-                if str(type(msg_content).__name__) in ['Image', 'File']:
-                    print(f"  Skipping Gradio component: {type(msg_content).__name__}")
-                    continue
-                
-                content_str = str(msg_content).strip()
-                if content_str:
-                    print(f"  ✅ Adding [{msg_role}]: {content_str[:30]}...")
-                    openai_messages.append({"role": msg_role, "content": content_str})
-        
-        # Add current user message
-        openai_messages.append({"role": "user", "content": message})
-        print(f"  ✅ Adding current message [user]: {message[:30]}...")
-        
-        print(f"📋 Total Gradio history: {len(history)} messages")
-        for i, msg in enumerate(history):
-            msg_role = msg.get("role") if isinstance(msg, dict) else getattr(msg, 'role', 'unknown')
-            msg_content = msg.get("content") if isinstance(msg, dict) else getattr(msg, 'content', '')
-            content_preview = str(msg_content)[:50] + "..." if len(str(msg_content)) > 50 else str(msg_content)
-            print(f"  {i}: [{msg_role}] {content_preview}")
-        
-        print(f"📋 OpenAI history ({len(openai_messages)} messages):")
-        for i, msg in enumerate(openai_messages):
-            role = msg["role"]
-            content = msg["content"][:100] + "..." if len(msg["content"]) > 100 else msg["content"]
-            print(f"  {i}: [{role}] {content}")
+        # A paraphrase of an earlier prompt, in the same conversation and with the same numbers
+        # and intent words, reuses its answer; embedding runs in a worker thread to keep the loop free
+        semantic_context = None
+        if semantic_cache is not None:
+            semantic_context = "{}:{}:{}".format(
+                LLMCache.key(self.model_name, openai_messages[:-1], self._tool_names),
+                " ".join(_NUMERIC_TOKENS_RE.findall(message)),
+                " ".join(sorted({word.lower() for word in _INTENT_WORDS_RE.findall(message)}))
+            )
+            cached_answer = await asyncio.to_thread(semantic_cache.get, message, semantic_context)
+            if cached_answer is not None:
+                logger.debug("Semantic cache hit (%s)", semantic_cache.stats)
+                current_history.append({"role": "assistant", "content": cached_answer})
+                yield current_history
+                return
+        turn_has_image = False
         
         try:
             # Agentic loop for tool calling
@@ -325,38 +464,110 @@ class MCPClientWrapper:
             
             while iteration < max_iterations:
                 iteration += 1
-                print(f"🔄 Agentic iteration {iteration}")
+                logger.debug("🔄 Agentic iteration %d", iteration)
+                
+                # Deterministic requests are answered from the cache when possible
+                cache_key = None
+                if self.llm_cache is not None:
+                    cache_key = self.llm_cache.key(self.model_name, openai_messages, self._tool_names)
+                cached = self.llm_cache.get(cache_key) if cache_key else None
                 
-                # Make LLM call
-                response = self.openai_client.chat.completions.create(
-                    model=self.model_name,
-                    messages=openai_messages,
-                    tools=self.tools if self.tools else None,
-                    stream=False
-                )
+                # An identical request already running for another session is shared instead of repeated;
+                # if it fails (None), this session makes its own
+                if not cached and cache_key:
+                    pending = self.llm_cache.inflight(cache_key)
+                    if pending is not None:
+                        cached = await asyncio.shield(pending)
                 
-                choice = response.choices[0]
-                message_obj = choice.message
+                streamed_idx = None
+                if cached:
+                    logger.debug("LLM cache hit (%s)", self.llm_cache.stats)
+                    response_content = cached["content"]
+                    response_tool_calls = cached["tool_calls"]
+                else:
+                    if cache_key:
+                        self.llm_cache.start_request(cache_key)
+                    completion = None
+                    try:
+                        # Make LLM call, streaming the answer as it is generated
+                        stream = await self.openai_client.chat.completions.create(
+                            model=self.model_name,
+                            messages=openai_messages,
+                            tools=self.tools if self.tools else None,
+                            temperature=NOT_GIVEN if TEMPERATURE is None else TEMPERATURE,
+                            stream=True
+                        )
+                        
+                        response_content = ""
+                        tool_call_parts = {}
+                        last_update = 0.0
+                        async for chunk in stream:
+                            if not chunk.choices:
+                                continue
+                            delta = chunk.choices[0].delta
+                        
+                            # Tool calls arrive in fragments keyed by their index
+                            for tool_call_delta in delta.tool_calls or []:
+                                part = tool_call_parts.setdefault(tool_call_delta.index, {"id": None, "name": "", "arguments": ""})
+                                if tool_call_delta.id:
+                                    part["id"] = tool_call_delta.id
+                                if tool_call_delta.function:
+                                    part["name"] += tool_call_delta.function.name or ""
+                                    part["arguments"] += tool_call_delta.function.arguments or ""
+                        
+                            if delta.content:
+                                response_content += delta.content
+                                # Show plain answers as they arrive; content starting with '[' may be a fake tool call list
+                                if not tool_call_parts and not response_content.lstrip().startswith('['):
+                                    if streamed_idx is None:
+                                        current_history.append({"role": "assistant", "content": response_content})
+                                        streamed_idx = len(current_history) - 1
+                                    else:
+                                        current_history[streamed_idx] = {"role": "assistant", "content": response_content}
+                                    # Coalesce token updates so the UI is not redrawn for every chunk
+                                    now = time.monotonic()
+                                    if now - last_update >= STREAM_UPDATE_INTERVAL:
+                                        last_update = now
+                                        yield current_history
+                        
+                        if streamed_idx is not None:
+                            # Flush the text received since the last update
+                            yield current_history
+                        
+                        response_tool_calls = [
+                            {
+                                "id": part["id"] or f"call_{index}",
+                                "type": "function",
+                                "function": {"name": part["name"], "arguments": part["arguments"]}
+                            }
+                            for index, part in sorted(tool_call_parts.items())
+                        ]
+                        
+                        completion = {"content": response_content, "tool_calls": response_tool_calls}
+                        if cache_key:
+                            self.llm_cache.set(cache_key, completion)
+                    finally:
+                        if cache_key:
+                            self.llm_cache.finish_request(cache_key, completion)
                 
-                print(f"🔍 Model response: {message_obj}")
-                print(f"🔍 Tool calls: {message_obj.tool_calls}")
-                print(f"🔍 Message content: {message_obj.content}")
+                logger.debug("🔍 Tool calls: %s", response_tool_calls)
+                logger.debug("🔍 Message content: %s", response_content)
                 
                 # Check if model wrote JSON tool calls in content instead of using tool_calls
                 fake_tool_calls = []
-                if message_obj.content and not message_obj.tool_calls:
-                    content = message_obj.content.strip()
-                    # Look for JSON arrays that look like tool calls (simplified check)
-                    if content.startswith('[{') and content.endswith('}]') and '"name"' in content:
-                        print(f"🔍 Found potential fake tool calls in content")
+                if response_content and not response_tool_calls:
+                    content = response_content.strip()
+                    # Look for JSON arrays that look like tool calls (prefix check only)
+                    if _FAKE_TOOLS_RE.match(content) and content.endswith('}]'):
+                        logger.debug("🔍 Found potential fake tool calls in content")
                         try:
                             # Try to parse the JSON directly
-                            parsed_tools = json.loads(content)
+                            parsed_tools = json_loads(content)
                             
                             # Convert to proper tool calls format
                             if isinstance(parsed_tools, list):
                                 for tool_data in parsed_tools:
-                                    if isinstance(tool_data, dict) and tool_data.get("name") in [t["function"]["name"] for t in self.tools]:
+                                    if isinstance(tool_data, dict) and tool_data.get("name") in self._tool_name_set:
                                         fake_tool_calls.append({
                                             "function": {
                                                 "name": tool_data["name"],
@@ -365,83 +576,91 @@ class MCPClientWrapper:
                                             "id": f"fake_call_{tool_data['name']}"
                                         })
                         except Exception as e:
-                            print(f"Error parsing fake tool calls: {e}")
+                            logger.warning("Error parsing fake tool calls: %s", e)
                 
                 # Process tool calls if any
-                if message_obj.tool_calls or fake_tool_calls:
-                    actual_tool_calls = message_obj.tool_calls or fake_tool_calls
+                if response_tool_calls or fake_tool_calls:
+                    actual_tool_calls = response_tool_calls or fake_tool_calls
                     
                     # Add assistant message with tool calls to conversation
-                    if message_obj.tool_calls:
+                    if response_tool_calls:
                         openai_messages.append({
                             "role": "assistant",
-                            "content": message_obj.content,
-                            "tool_calls": message_obj.tool_calls
+                            "content": response_content or None,
+                            "tool_calls": response_tool_calls
                         })
                     else:
                         openai_messages.append({
                             "role": "assistant", 
-                            "content": message_obj.content
+                            "content": response_content
                         })
                     
-                    # Process each tool call sequentially
+                    # Parse every tool call and show them all as pending
+                    pending_calls = []
                     for tool_call in actual_tool_calls:
-                        # Handle both real tool_call objects and fake dict tool calls
-                        if hasattr(tool_call, 'function'):
-                            tool_name = tool_call.function.name
-                            tool_args_str = tool_call.function.arguments
-                            tool_call_id = tool_call.id
-                        else:
-                            tool_name = tool_call["function"]["name"]
-                            tool_args_str = tool_call["function"]["arguments"]
-                            tool_call_id = tool_call.get('id', f'fake_call_{tool_name}')
+                        # Streamed and fake tool calls share the same dict format
+                        tool_name = tool_call["function"]["name"]
+                        tool_args_str = tool_call["function"]["arguments"]
+                        tool_call_id = tool_call.get('id', f'fake_call_{tool_name}')
                         
                         try:
-                            tool_args = json.loads(tool_args_str)
+                            tool_args = json_loads(tool_args_str)
                         except json.JSONDecodeError as e:
-                            print(f"Error decoding tool arguments: {e}")
+                            logger.warning("Error decoding tool arguments: %s", e)
                             tool_args = {}
                         
+                        tool_log = tool_id = pending_idx = None
                         if SHOW_TOOLS:
+                            # Serialized once, shared by the pending and done entries
+                            tool_log = f"Parameters: {safe_json_dumps(tool_args, ensure_ascii=False, indent=2)}"
+                            
                             # Show that tool is being used
+                            tool_id = f"tool_call_{iteration}_{tool_name}"
                             current_history.append({
                                 "role": "assistant",
                                 "content": f"🔧 Executing tool: **{tool_name}**",
                                 "metadata": {
                                     "title": f"Tool: {tool_name}",
-                                    "log": f"Parameters: {safe_json_dumps(tool_args, ensure_ascii=False, indent=2)}",
+                                    "log": tool_log,
                                     "status": "pending",
-                                    "id": f"tool_call_{iteration}_{tool_name}"
+                                    "id": tool_id
                                 }
                             })
-                            yield current_history
+                            pending_idx = len(current_history) - 1
                         
-                        # Call the tool
-                        print(f"🔧 Executing tool (iteration {iteration}): {tool_name}")
-                        print(f"📝 Parameters: {tool_args}")
+                        logger.debug("🔧 Executing tool (iteration %d): %s %s", iteration, tool_name, tool_args)
+                        pending_calls.append((tool_name, tool_args, tool_call_id, tool_log, tool_id, pending_idx))
+                    
+                    if SHOW_TOOLS:
+                        yield current_history
+                    
+                    # The tool calls are independent, so run them concurrently
+                    tool_results = await asyncio.gather(
+                        *(self.call_tool_async(tool_name, tool_args) for tool_name, tool_args, *_ in pending_calls),
+                        return_exceptions=True
+                    )
+                    
+                    for (tool_name, tool_args, tool_call_id, tool_log, tool_id, pending_idx), tool_result in zip(pending_calls, tool_results):
+                        if isinstance(tool_result, Exception):
+                            tool_result = {"error": f"Error calling tool {tool_name}: {str(tool_result)}"}
                         
-                        tool_result = await self.call_tool_async(tool_name, tool_args)
+                        raw_result = None
+                        if isinstance(tool_result, dict) and "_raw" in tool_result:
+                            raw_result = tool_result["_raw"]
+                            tool_result = tool_result["_parsed"]
                         
                         if SHOW_TOOLS:
-                            # Update tool status
-                            tool_id = f"tool_call_{iteration}_{tool_name}"
-                            for i, msg in enumerate(current_history):
-                                if (isinstance(msg, dict) and 
-                                    msg.get("metadata", {}).get("id") == tool_id and 
-                                    msg.get("metadata", {}).get("status") == "pending"):
-                                    # Update the existing message status
-                                    current_history[i] = {
-                                        "role": "assistant",
-                                        "content": f"✅ Tool executed: **{tool_name}**" if not (isinstance(tool_result, dict) and "error" in tool_result) else f"❌ Tool error: **{tool_name}**",
-                                        "metadata": {
-                                            "title": f"Tool: {tool_name}",
-                                            "log": f"Parameters: {safe_json_dumps(tool_args, ensure_ascii=False, indent=2)}",
-                                            "status": "done",
-                                            "id": tool_id
-                                        }
-                                    }
-                                    break
-                            yield current_history
+                            # Update the pending message status in place
+                            current_history[pending_idx] = {
+                                "role": "assistant",
+                                "content": f"✅ Tool executed: **{tool_name}**" if not (isinstance(tool_result, dict) and "error" in tool_result) else f"❌ Tool error: **{tool_name}**",
+                                "metadata": {
+                                    "title": f"Tool: {tool_name}",
+                                    "log": tool_log,
+                                    "status": "done",
+                                    "id": tool_id
+                                }
+                            }
                         
                         # Add tool result to conversation
                         openai_messages.append({
@@ -465,32 +684,38 @@ class MCPClientWrapper:
                                     if key in result_serialized:
                                         potential_path = result_serialized[key]
                                         if isinstance(potential_path, str):
-                                            # Check if it's a URL or local file that exists
-                                            if potential_path.startswith(('http://', 'https://')) or os.path.exists(potential_path):
+                                            # URLs need no check; only stat plausible local paths, off the event loop
+                                            if potential_path.startswith(('http://', 'https://')):
+                                                image_path = potential_path
+                                                break
+                                            elif (potential_path.startswith(('/', './'))
+                                                    and await asyncio.to_thread(os.path.exists, potential_path)):
                                                 image_path = potential_path
                                                 break
                             
                             if image_path:
-                                print(f"🖼️ Image found: {image_path}")
+                                logger.debug("🖼️ Image found: %s", image_path)
                                 
                                 # Show the image using dictionary format and gr.Image
+                                turn_has_image = True
                                 current_history.append({
                                     "role": "assistant",
                                     "content": gr.Image(value=image_path, show_label=False)
                                 })
-                                yield current_history
                                 
                                 # Don't show additional technical information for diagrams
                                 # The user can see the diagram directly, no need for technical details
                             else:
-                                # Show result in JSON format  
-                                formatted_result = safe_json_dumps(result_serialized, ensure_ascii=False, indent=2)
+                                # Show result in JSON format, reusing the tool's text when it was not modified
+                                if raw_result is not None:
+                                    formatted_result = raw_result.strip()
+                                else:
+                                    formatted_result = safe_json_dumps(result_serialized, ensure_ascii=False, indent=2)
                                 json_content = "```json\n" + formatted_result + "\n```"
                                 current_history.append({
                                     "role": "assistant",
                                     "content": json_content
                                 })
-                                yield current_history
                         else:
                             # Tool error
                             if isinstance(tool_result, dict) and "error" in tool_result:
@@ -502,23 +727,29 @@ class MCPClientWrapper:
                                 "role": "assistant",
                                 "content": f"❌ Tool error {tool_name}: {error_msg}"
                             })
-                            yield current_history
+                    
+                    # All results are ready together, so show them in a single update
+                    yield current_history
                 
                 else:
                     # No tool calls, add final response and break
                     openai_messages.append({
                         "role": "assistant",
-                        "content": message_obj.content
+                        "content": response_content
                     })
                     
-                    # Add final response directly (no streaming to avoid parsing issues)
-                    if message_obj.content:
+                    # Add the final response if it was held back while streaming
+                    if response_content and streamed_idx is None:
                         current_history.append({
                             "role": "assistant", 
-                            "content": message_obj.content
+                            "content": response_content
                         })
                         yield current_history
                     
+                    # Only text answers are reused; a replay could not show the diagrams of this turn
+                    if semantic_cache is not None and response_content and not turn_has_image:
+                        await asyncio.to_thread(semantic_cache.add, message, response_content, semantic_context)
+                    
                     break
             
             yield current_history
@@ -529,11 +760,6 @@ class MCPClientWrapper:
                 "content": f"❌ Error processing query: {str(e)}"
             })
             yield current_history
-    
-    async def process_message_streaming(self, message: str, history):
-        """Process message with streaming for Gradio"""
-        async for result in self.process_message_async(message, history):
-            yield result
 
 # MCP client instance
 client = MCPClientWrapper()
@@ -544,7 +770,7 @@ def toggle_tools_display(show_tools):
     SHOW_TOOLS = show_tools
     return f"🔧 Show tools: {'✅ Enabled' if show_tools else '❌ Disabled'}"
 
-def user(user_message: str, history):
+async def user(user_message: str, history):
     """Add user message to history"""
     if not user_message.strip():
         return "", history
@@ -553,6 +779,10 @@ def user(user_message: str, history):
     new_history = history + [{"role": "user", "content": user_message}]
     return "", new_history
 
+async def clear_chat():
+    """Empty the chat and the message box"""
+    return [], ""
+
 async def bot(history):
     """Process bot response with streaming"""
     if not history or len(history) == 0:
@@ -562,13 +792,9 @@ async def bot(history):
     # Get the last user message (handle both dict and message objects)
     last_user_message = None
     for msg in reversed(history):
-        # Handle both dictionaries and message objects
-        if isinstance(msg, dict):
-            if msg.get("role") == "user":
-                last_user_message = msg.get("content")
-                break
-        elif hasattr(msg, 'role') and msg.role == "user":
-            last_user_message = msg.content
+        msg_role, msg_content = _to_role_content(msg)
+        if msg_role == "user":
+            last_user_message = msg_content
             break
     
     if not last_user_message:
@@ -583,11 +809,10 @@ async def bot(history):
         else:
             converted_history.append(msg)
     
-    print(f"🎯 Processing user message: '{last_user_message}'")
-    print(f"📚 Previous history: {len(converted_history)} messages")
+    logger.debug("🎯 Processing user message: %r (%d previous messages)", last_user_message, len(converted_history))
     
     # Process with MCP client
-    async for result in client.process_message_streaming(last_user_message, converted_history):
+    async for result in client.process_message_async(last_user_message, converted_history):
         yield result
 
 def gradio_interface():
@@ -640,13 +865,7 @@ def gradio_interface():
         
         # Examples
         gr.Examples(
-            examples=[
-                "Analyze the IP 192.168.1.100/24",
-                "Calculate 4 subnets for the network 10.0.0.0/16",
-                "Generate a diagram of the network 172.16.0.0/20 with 8 subnets",
-                "What is the broadcast address of 192.168.50.0/26?",
-                "Divide the network 10.10.0.0/22 into subnets of 100 hosts each"
-            ],
+            examples=EXAMPLES,
             inputs=msg,
             label="Query Examples"
         )
@@ -655,25 +874,30 @@ def gradio_interface():
         tools_toggle.change(toggle_tools_display, inputs=tools_toggle, outputs=[])
         
         # Message sending (correct Gradio pattern)
+        # user already empties the message box, so no extra step is chained after bot
         msg.submit(user, [msg, chatbot], [msg, chatbot], queue=False).then(
             bot, chatbot, chatbot
-        ).then(lambda: "", None, msg)
+        )
         
         send_btn.click(user, [msg, chatbot], [msg, chatbot], queue=False).then(
             bot, chatbot, chatbot
-        ).then(lambda: "", None, msg)
+        )
         
-        clear_btn.click(lambda: ([], ""), None, [chatbot, msg])
+        clear_btn.click(clear_chat, None, [chatbot, msg])
         
     return demo
 
 if __name__ == "__main__":
+    logging.basicConfig(level=os.getenv("LOGLEVEL", "WARNING"))
+    
     # Check environment variables
-    if not os.getenv("OPENROUTER_API_KEY"):
+    if not OPENROUTER_API_KEY:
         print("⚠️  Warning: OPENROUTER_API_KEY not found. Please configure it in your .env file")
     
-    if not os.getenv("OPENROUTER_BASE_URL"):
+    if OPENROUTER_BASE_URL == DEFAULT_OPENROUTER_BASE_URL:
         print("ℹ️  Info: OPENROUTER_BASE_URL not configured, using default URL")
     
     interface = gradio_interface()
-    interface.launch(debug=True, share=False)
\ No newline at end of file
+    # Streaming handlers need the queue to deliver each yielded update
+    interface.queue(default_concurrency_limit=QUEUE_CONCURRENCY, max_size=QUEUE_MAX_SIZE)
+    interface.launch(debug=False, share=False, max_threads=40)
\ No newline at end of file
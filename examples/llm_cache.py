@@ -0,0 +1,260 @@
+"""
+LLM response cache for the IPMentor chatbot examples.
+
+Completions are cached in memory under a hash of everything that determines
+them (model, messages and available tools), so repeating a deterministic
+request is served without a call to the model provider. Given a path, entries
+are also kept in SQLite so they survive restarts.
+
+SemanticCache additionally answers paraphrased prompts from earlier answers.
+It needs sentence-transformers and faiss, which are optional.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+# orjson is optional; the stdlib json module is used when it is not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import faiss
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    faiss = None
+
+logger = logging.getLogger(__name__)
+
+
+class LLMCache:
+    """Exact-match LRU cache of LLM completions."""
+
+    def __init__(self, max_size: int = 256, path: Optional[str] = None, ttl: int = 7 * 24 * 3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        # key -> (time stored, completion)
+        self._entries = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0}
+        # Futures of the requests currently being made, by key
+        self._inflight = {}
+
+        # Optional persistent store behind the in-memory LRU
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, response BLOB, ts INTEGER)")
+            self._prune()
+
+    def _prune(self) -> None:
+        # Delete expired rows; reads skip them anyway, this only keeps the file from growing
+        self._last_prune = time.time()
+        self._db.execute("DELETE FROM cache WHERE ts <= ?", (int(self._last_prune) - self.ttl,))
+
+    @staticmethod
+    def key(model: str, messages: list, tool_names: Tuple[str, ...]) -> str:
+        """Return the cache key for a completion request; `tool_names` must be sorted."""
+        request = {"model": model, "messages": messages, "tools": tool_names}
+        if orjson is not None:
+            payload = orjson.dumps(request, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS, default=str)
+        else:
+            payload = json.dumps(request, sort_keys=True, default=str).encode()
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached completion for `key`, or None on a miss."""
+        now = time.time()
+        value = None
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > now - self.ttl:
+                value = entry[1]
+            else:
+                del self._entries[key]
+        if value is None and self._db is not None:
+            row = self._db.execute(
+                "SELECT response, ts FROM cache WHERE key = ? AND ts > ?", (key, int(now) - self.ttl)
+            ).fetchone()
+            if row is not None:
+                value = orjson.loads(row[0]) if orjson is not None else json.loads(row[0])
+                self._entries[key] = (row[1], value)
+                self._evict()
+        if value is None:
+            self.stats["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a completion, evicting the least recently used ones beyond max_size."""
+        now = time.time()
+        self._entries[key] = (now, value)
+        self._entries.move_to_end(key)
+        self._evict()
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache (key, response, ts) VALUES (?, ?, ?)",
+                (key, orjson.dumps(value) if orjson is not None else json.dumps(value), int(now))
+            )
+            # Expired rows are swept at most once an hour
+            if now - self._last_prune >= 3600:
+                self._prune()
+
+    def _evict(self) -> None:
+        # Drop the least recently used entries beyond max_size
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def inflight(self, key: str) -> Optional[asyncio.Future]:
+        """Return the future of an identical request already in progress, if any."""
+        return self._inflight.get(key)
+
+    def start_request(self, key: str) -> None:
+        """
+        Register a request for `key` as in progress.
+
+        Callers run on a single event loop and register before their first
+        await, so no lock is needed.
+        """
+        self._inflight[key] = asyncio.get_running_loop().create_future()
+
+    def finish_request(self, key: str, value: Any) -> None:
+        """Hand the completion (None if the request failed) to everyone waiting on `key`."""
+        future = self._inflight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(value)
+
+    def clear(self) -> None:
+        """Drop every cached completion."""
+        self._entries.clear()
+        if self._db is not None:
+            self._db.execute("DELETE FROM cache")
+
+
+class SemanticCache:
+    """
+    Cache of final answers looked up by prompt similarity.
+
+    Prompts are embedded with a small local sentence-transformer and searched
+    by cosine similarity. A hit also requires the same context string, which
+    callers use to pin the conversation and any values (such as addresses)
+    that a paraphrase must not change.
+
+    The embedding model is loaded on first use, and lookups and additions
+    block on it, so async callers should run them in a worker thread. Given a
+    path prefix, the index and its entries are reloaded on first use and saved
+    at most every save_interval seconds, and by save() on shutdown.
+    """
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", threshold: float = 0.95,
+                 max_size: int = 10_000, top_k: int = 4, path: Optional[str] = None,
+                 save_interval: float = 60.0):
+        self.model_name = model_name
+        self.threshold = threshold
+        self.max_size = max_size
+        self.top_k = top_k
+        self.save_interval = save_interval
+        self._model = None
+        self._index = None
+        # (prompt, response, context) per index row, oldest first
+        self._entries = []
+        self.stats = {"hits": 0, "misses": 0}
+        # Guards the model, index and entries, which worker threads share
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+        self._index_path = f"{path}.faiss" if path else None
+        self._entries_path = f"{path}.json" if path else None
+
+    @staticmethod
+    def available() -> bool:
+        """Return True if the optional embedding dependencies are installed."""
+        return faiss is not None
+
+    def _load(self) -> None:
+        # Called with the lock held; loads the model and any saved index once
+        if self._model is not None:
+            return
+        self._model = SentenceTransformer(self.model_name)
+        dimension = self._model.get_sentence_embedding_dimension()
+        self._index = faiss.IndexFlatIP(dimension)
+        if self._index_path and os.path.exists(self._index_path) and os.path.exists(self._entries_path):
+            try:
+                index = faiss.read_index(self._index_path)
+                with open(self._entries_path, "r", encoding="utf-8") as f:
+                    entries = [tuple(entry) for entry in json.load(f)]
+            except (OSError, RuntimeError, ValueError) as e:
+                logger.warning("Ignoring unreadable semantic cache files: %s", e)
+                return
+            if index.d == dimension and index.ntotal == len(entries):
+                self._index, self._entries = index, entries
+            else:
+                logger.warning("Ignoring semantic cache files written for another model or out of sync")
+
+    def _embed(self, prompt: str):
+        # Normalized embeddings make inner product equal to cosine similarity
+        return self._model.encode([prompt], normalize_embeddings=True).astype("float32")
+
+    def get(self, prompt: str, context: str) -> Optional[str]:
+        """Return the answer cached for a similar prompt in the same context, or None."""
+        with self._lock:
+            self._load()
+            if self._entries:
+                scores, ids = self._index.search(self._embed(prompt), min(self.top_k, len(self._entries)))
+                for score, idx in zip(scores[0], ids[0]):
+                    if score < self.threshold:
+                        break
+                    if idx >= 0 and self._entries[idx][2] == context:
+                        self.stats["hits"] += 1
+                        return self._entries[idx][1]
+            self.stats["misses"] += 1
+            return None
+
+    def add(self, prompt: str, response: str, context: str) -> None:
+        """Store an answer, evicting the oldest ones beyond max_size."""
+        with self._lock:
+            self._load()
+            self._index.add(self._embed(prompt))
+            self._entries.append((prompt, response, context))
+            if len(self._entries) > self.max_size:
+                # FAISS flat indexes renumber rows after removal, matching the list
+                overflow = len(self._entries) - self.max_size
+                self._index.remove_ids(faiss.IDSelectorRange(0, overflow))
+                del self._entries[:overflow]
+            self._dirty = True
+            if time.monotonic() - self._last_save >= self.save_interval:
+                self._save()
+
+    def save(self) -> None:
+        """Write unsaved additions to disk, if a path was given."""
+        with self._lock:
+            self._save()
+
+    def _save(self) -> None:
+        # Called with the lock held. Each file is written beside its target and
+        # renamed over it, so a crash never leaves a half-written file behind
+        if not (self._index_path and self._dirty):
+            return
+        try:
+            faiss.write_index(self._index, f"{self._index_path}.tmp")
+            with open(f"{self._entries_path}.tmp", "w", encoding="utf-8") as f:
+                json.dump(self._entries, f)
+            os.replace(f"{self._index_path}.tmp", self._index_path)
+            os.replace(f"{self._entries_path}.tmp", self._entries_path)
+        except (OSError, RuntimeError) as e:
+            logger.warning("Could not save the semantic cache: %s", e)
+            return
+        self._dirty = False
+        self._last_save = time.monotonic()
@@ -0,0 +1,21 @@
+"""
+IPMentor - IPv4 Network Analysis and Subnetting Tutor
+"""
+
+import importlib
+
+# Public attributes resolved on first access, so importing the package
+# does not pull in Gradio until the UI is actually needed
+_LAZY_ATTRS = {
+    "create_interface": "ipmentor.ui",
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
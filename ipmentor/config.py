@@ -2,18 +2,58 @@
 Simple configuration for IPMentor.
 """
 
+import functools
 import os
+import tempfile
+from dataclasses import dataclass
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# Basic settings
-HOST = os.getenv("HOST", "0.0.0.0")
-PORT = int(os.getenv("PORT", 7861))
-DEBUG = os.getenv("DEBUG", "false").lower() == "true"
-MCP_ENABLED = os.getenv("MCP_ENABLED", "true").lower() == "true"
+
+@dataclass(frozen=True, slots=True)
+class Config:
+    """Settings read from the environment once at import time."""
+
+    # Basic settings
+    host: str
+    port: int
+    debug: bool
+    mcp_enabled: bool
+
+    # Hugging Face Space settings
+    space_port: int
+    port_retries: int
+    queue_concurrency: int
+    queue_max: int
+    max_threads: int
+    ready_file: str
+
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def from_env(cls) -> "Config":
+        """Build the configuration from environment variables."""
+        queue_concurrency = int(os.getenv("IPMENTOR_QUEUE_CONCURRENCY", 16))
+        return cls(
+            host=os.getenv("HOST", "0.0.0.0"),
+            port=int(os.getenv("PORT", 7861)),
+            debug=os.getenv("DEBUG", "false").lower() == "true",
+            mcp_enabled=os.getenv("MCP_ENABLED", "true").lower() == "true",
+            space_port=int(os.getenv("GRADIO_SERVER_PORT", 7860)),
+            # No fallback by default: the Space only routes to its configured port
+            port_retries=int(os.getenv("IPMENTOR_PORT_RETRIES", 0)),
+            queue_concurrency=queue_concurrency,
+            queue_max=int(os.getenv("IPMENTOR_QUEUE_MAX", 128)),
+            # At least one worker thread per queue slot, since generate_diagram blocks on the
+            # d2 subprocess; otherwise twice the CPU count for the CPU-bound tools
+            max_threads=int(os.getenv("IPMENTOR_MAX_THREADS", max(queue_concurrency, (os.cpu_count() or 1) * 2))),
+            ready_file=os.getenv("IPMENTOR_READY_FILE", os.path.join(tempfile.gettempdir(), "ipmentor.ready")),
+        )
+
+
+CONFIG = Config.from_env()
 
 # App info
 APP_NAME = "IPMentor"
 VERSION = "1.0.0"
-DESCRIPTION = "IPv4 network analysis and subnetting tutor"
\ No newline at end of file
+DESCRIPTION = "IPv4 network analysis and subnetting tutor"
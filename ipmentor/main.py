@@ -3,12 +3,11 @@ IPMentor - IPv4 Network Analysis and Subnetting Tutor
 """
 
 import logging
-from .ui import create_interface
-from .config import HOST, PORT, DEBUG, MCP_ENABLED, APP_NAME, VERSION
+from .config import CONFIG, APP_NAME, VERSION
 
 # Simple logging setup
 logging.basicConfig(
-    level=logging.INFO if not DEBUG else logging.DEBUG,
+    level=logging.INFO if not CONFIG.debug else logging.DEBUG,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
@@ -19,22 +18,23 @@ def main():
     """Main application entry point."""
     logger.info(f"Starting {APP_NAME} v{VERSION}")
     
-    # Create Gradio app
+    # Create Gradio app (imports Gradio on first use)
+    from . import create_interface
     app = create_interface()
     
     # Launch configuration
     launch_config = {
-        "server_name": HOST,
-        "server_port": PORT,
+        "server_name": CONFIG.host,
+        "server_port": CONFIG.port,
         "share": False,
-        "show_error": DEBUG,
-        "mcp_server": MCP_ENABLED,
-        "quiet": not DEBUG
+        "show_error": CONFIG.debug,
+        "mcp_server": CONFIG.mcp_enabled,
+        "quiet": not CONFIG.debug
     }
     
-    logger.info(f"🌐 Web Interface: http://{HOST}:{PORT}")
-    if MCP_ENABLED:
-        logger.info(f"🤖 MCP Server: http://{HOST}:{PORT}/gradio_api/mcp/sse")
+    logger.info(f"🌐 Web Interface: http://{CONFIG.host}:{CONFIG.port}")
+    if CONFIG.mcp_enabled:
+        logger.info(f"🤖 MCP Server: http://{CONFIG.host}:{CONFIG.port}/gradio_api/mcp/sse")
     
     try:
         app.launch(**launch_config)
@@ -361,6 +361,11 @@ EDGE_STYLE_BASE = (
     '    stroke-width: 3\n'
 )
 
+# D2 line patterns used when styling diagrams
+D2_NODE_RE = re.compile(r'^(\w+(?:_\d+)?):\s*(Cloud|Router|Switch|Hosts)\s*$')
+D2_EDGE_WITH_LABEL_RE = re.compile(r'^(\w+(?:_\d+)?) -> (\w+(?:_\d+)?):\s*"([^"]+)"$')
+D2_EDGE_RE = re.compile(r'^(\w+(?:_\d+)?) -> (\w+(?:_\d+)?)$')
+
 
 def _generate_basic_d2_diagram(network_ip: str, hosts_per_subnet: List[int]) -> str:
     """Generate basic D2 diagram without styling."""
@@ -395,7 +400,7 @@ def _style_d2_diagram(diagram: str) -> str:
           continue
 
       # Nodes
-      node_match = re.match(r'^(\w+(?:_\d+)?):\s*(Cloud|Router|Switch|Hosts)\s*$',line.strip())
+      node_match = D2_NODE_RE.match(line.strip())
       if node_match:
           name, kind = node_match.groups()
           styled.append(
@@ -410,7 +415,7 @@ def _style_d2_diagram(diagram: str) -> str:
           continue
 
       # Edges with labels
-      edge_with_label_match = re.match(r'^(\w+(?:_\d+)?) -> (\w+(?:_\d+)?):\s*"([^"]+)"$', line.strip())
+      edge_with_label_match = D2_EDGE_WITH_LABEL_RE.match(line.strip())
       if edge_with_label_match:
           src, dst, label = edge_with_label_match.groups()
           styled.append(
@@ -423,7 +428,7 @@ def _style_d2_diagram(diagram: str) -> str:
           continue
 
       # Edges without labels
-      edge_match = re.match(r'^(\w+(?:_\d+)?) -> (\w+(?:_\d+)?)$',line.strip())
+      edge_match = D2_EDGE_RE.match(line.strip())
       if edge_match:
           src, dst = edge_match.groups()
           styled.append(
@@ -789,4 +794,19 @@ def generate_subnetting_exercise(use_vlsm: bool = False) -> str:
         }, indent=2)
 
     except Exception as e:
-        return json.dumps({"error": str(e)}, indent=2)
\ No newline at end of file
+        return json.dumps({"error": str(e)}, indent=2)
+
+
+def warmup() -> None:
+    """
+    Run the calculation paths once with canned inputs.
+
+    Called in the background after launch so the first real request hits
+    already-warm code. Diagram export is skipped because it spawns d2 and
+    writes a file; only the D2 source generation and styling are exercised.
+    """
+    ip_info("192.168.1.10", "/24")
+    subnet_calculator("192.168.1.0/24", "4", "max_subnets")
+    subnet_calculator("192.168.1.0/24", "50", "max_hosts_per_subnet")
+    subnet_calculator("192.168.1.0/24", "", "vlsm", "50,20,10,5")
+    _style_d2_diagram(_generate_basic_d2_diagram("192.168.1.0/24", [50, 20, 10, 5]))
@@ -68,11 +68,9 @@ def generate_exercise(use_vlsm: bool = False):
         return None, json.dumps({"error": str(e)}, indent=2)
 
 
-def create_interface():
-    """Create the Gradio interface."""
-    
-    # Create separate interfaces for MCP tools only
-    ip_interface = gr.Interface(
+def _build_ip_interface():
+    """Build the IP Info tool interface."""
+    return gr.Interface(
         fn=ip_info,
         api_name="ip_info",
         inputs=[
@@ -83,8 +81,11 @@ def create_interface():
         title="IP Info",
         description="Analyze IPv4 addresses with subnet masks"
     )
-    
-    subnet_interface = gr.Interface(
+
+
+def _build_subnet_interface():
+    """Build the Subnet Calculator tool interface."""
+    return gr.Interface(
         fn=subnet_calculator,
         api_name="subnet_calculator",
         inputs=[
@@ -97,8 +98,11 @@ def create_interface():
         title="Subnet Calculator",
         description="Calculate subnets using different methods"
     )
-    
-    diagram_interface = gr.Interface(
+
+
+def _build_diagram_interface():
+    """Build the Network Diagram tool interface."""
+    return gr.Interface(
         fn=generate_diagram,
         api_name="generate_diagram",
         inputs=[
@@ -114,7 +118,10 @@ def create_interface():
         description="Generate network diagrams (PNG by default, SVG optional)"
     )
 
-    exercise_interface = gr.Interface(
+
+def _build_exercise_interface():
+    """Build the Exercise Generator tool interface."""
+    return gr.Interface(
         fn=generate_exercise,
         api_name="generate_exercise",
         inputs=[
@@ -128,6 +135,18 @@ def create_interface():
         description="Generate complete random subnetting exercises with solution and diagram. Number of subnets (2-32) is randomly chosen. Enable VLSM for variable host requirements per subnet, or disable for equal division."
     )
 
+
+def create_interface():
+    """Create the Gradio interface."""
+    
+    # Create separate interfaces for MCP tools only. Built one after another:
+    # Gradio tracks the block being constructed in process-global state, so
+    # building them on worker threads would interleave their components.
+    ip_interface = _build_ip_interface()
+    subnet_interface = _build_subnet_interface()
+    diagram_interface = _build_diagram_interface()
+    exercise_interface = _build_exercise_interface()
+
     # Create main interface with custom header and description
     with gr.Blocks() as combined_app:
         # Header with logo